@@ -6,7 +6,18 @@ from bamboopy.error import BambooNoPermissions
 from bamboopy.error import BambooLimitExceeded
 from bamboopy.error import BambooUnauthorized
 from bamboopy.error import BambooServerError
+from bamboopy.error import BambooCircuitOpen
 
 from bamboopy import logging_helper
+from bamboopy.hedging import HedgePolicy
+from bamboopy.breaker import AdaptiveTimeout
+from bamboopy.breaker import CircuitBreaker
+from bamboopy.breaker import CircuitBreakers
+from bamboopy.pool import ConnectionPool
+from bamboopy.ratelimit import RateLimiter
+from bamboopy.transport import Transport
+from bamboopy.transport import RecordingTransport
+from bamboopy.transport import ReplayTransport
 from bamboopy.base import BaseClient
+from bamboopy.offload import ParsePool
 from bamboopy.bamboohr import BambooHR
@@ -0,0 +1,5 @@
+import sys
+
+from bamboopy.cli import main
+
+sys.exit(main())
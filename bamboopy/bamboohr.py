@@ -1,5 +1,10 @@
+import functools
+
 from bamboopy import logging_helper
 from bamboopy import BaseClient
+from bamboopy.bulk import run_bulk, validate_date
+from bamboopy.converters import field_types
+from bamboopy.planner import FetchPlanner
 from bamboopy.resources import Directory
 from bamboopy.resources import Employee
 from bamboopy.resources import Field
@@ -39,22 +44,34 @@ class BambooHR(BaseClient):
         """
         pass
 
-    def get_employee(self, employee_id, fields=None, **options):
+    def get_employee(self, employee_id, fields=None, schema=None, **options):
         """
 
         :param employee_id: The employee id
         :type employee_id: int
         :param fields: an list of field aliases or ids
         :type fields: list
+        :param schema: field id/alias => type to convert the values, e.g. field_types(self.get_fields())
+        :type schema: dict
         :param options:
         :return:
         """
         fields = fields or ['firstName', 'lastName']
-        result = self._call("employees/%s" % employee_id, query='fields={}'.format(",".join(fields)), **options)
-        if not result:
-            return
+        resource = functools.partial(Employee, fields=fields, schema=schema)
+        return self._call("employees/%s" % employee_id, query='fields={}'.format(",".join(fields)), resource=resource, **options)
 
-        return Employee(result, fields)
+    def fetch(self, employee_ids, fields, cache=None, **planner_options):
+        """
+        Reads fields of employees through the cheapest endpoint, see FetchPlanner
+        :param employee_ids: employee ids, None for every employee
+        :type employee_ids: list
+        :param fields: field ids or aliases
+        :type fields: list
+        :param cache: an EmployeeCache to serve from and keep up to date
+        :type cache: bamboopy.cache.EmployeeCache
+        :return: a dict of employee id => dict of field => value
+        """
+        return FetchPlanner(self, cache, **planner_options).fetch(employee_ids, fields)
 
     def get_report(self, report_id, format, filter_duplicates=True):
         pass
@@ -113,11 +130,7 @@ class BambooHR(BaseClient):
             xml += '<field id="%s" />' % field
         xml += '</fields>'
 
-        result = self._call("reports/custom/", data='<report>%s</report>' % xml, query="format=%s" % format, method='POST', content_type='text/xml')
-        if not result:
-            return
-
-        return Report(result)
+        return self._call("reports/custom/", data='<report>%s</report>' % xml, query="format=%s" % format, method='POST', content_type='text/xml', resource=Report)
 
     def get_table(self, employee_id, table_name='all'):
         """
@@ -127,8 +140,20 @@ class BambooHR(BaseClient):
         """
         return self._call('employees/{0}/tables/{1}/'.format(employee_id, table_name))
 
-    def get_changed_employees(self, since, type='all'):
-        pass
+    def get_changed_employees(self, since, type='all', **options):
+        """
+        :param since: Date in ISO 8601 format, like: 2012-10-17T16:00:00Z
+        :type since: str
+        :param type: all, inserted, updated or deleted
+        :type type: str
+        :param options:
+        :return: a dict of employee id => {'id', 'action', 'lastChanged'}
+        """
+        result = self._call('employees/changed', query='since=%s&type=%s' % (since, type), **options)
+        if not result:
+            return {}
+
+        return result.get('employees') or {}
 
     def get_metadata(self, type, **options):
         """
@@ -160,6 +185,17 @@ class BambooHR(BaseClient):
 
         return [Field(x) for x in meta]
 
+    def get_field_types(self, refresh=False):
+        """
+        Types of the fields, cached after the first call, usable as schema of get_employee
+        :param refresh: fetch them again
+        :type refresh: bool
+        :return: a dict of field id and alias => field type
+        """
+        if refresh or getattr(self, '_field_types', None) is None:
+            self._field_types = field_types(self.get_fields() or [])
+        return self._field_types
+
     def get_tables(self):
         meta = self.get_metadata('tables')
         if not meta:
@@ -173,17 +209,148 @@ class BambooHR(BaseClient):
     def get_timeoff_types(self):
         return self.get_metadata('time_off/types')
 
+    def get_timeoff_type_ids(self, refresh=False):
+        """
+        Ids of the time off types, cached after the first call
+        :param refresh: fetch them again
+        :type refresh: bool
+        :return: a set of type ids as strings
+        """
+        if refresh or getattr(self, '_timeoff_type_ids', None) is None:
+            types = self.get_timeoff_types() or {}
+            if isinstance(types, dict):
+                types = types.get('timeOffTypes') or []
+            self._timeoff_type_ids = set(str(x['id']) for x in types)
+        return self._timeoff_type_ids
+
     def add_table_row(self, employee_id, table_name, values):
         pass
 
-    def add_timeoff_request(self, employee_id, start, end, timeoff_type_id, amount, status, employee_note, manager_note, previous=0):
-        pass
+    def add_timeoff_request(self, employee_id, start, end, timeoff_type_id, amount, status, employee_note, manager_note, previous=0, **options):
+        """
 
-    def add_timeoff_history_request(self, employee_id, ymd, request_id):
-        pass
+        :param employee_id: the employee id
+        :type employee_id: int
+        :param start: first day, YYYY-MM-DD
+        :type start: str
+        :param end: last day, YYYY-MM-DD
+        :type end: str
+        :param timeoff_type_id: the time off type id
+        :type timeoff_type_id: int
+        :param amount: the amount of time, in the unit of the type
+        :type amount: float
+        :param status: approved, denied, declined, requested...
+        :type status: str
+        :param employee_note: note from the employee
+        :type employee_note: str
+        :param manager_note: note from the manager
+        :type manager_note: str
+        :param previous: id of the request this one replaces
+        :type previous: int
+        :param options:
+        :return:
+        """
+        data = {'status': status, 'start': start, 'end': end, 'timeOffTypeId': timeoff_type_id, 'amount': amount}
+        notes = []
+        if employee_note:
+            notes.append({'from': 'employee', 'note': employee_note})
+        if manager_note:
+            notes.append({'from': 'manager', 'note': manager_note})
+        if notes:
+            data['notes'] = notes
+        if previous:
+            data['previousRequest'] = previous
 
-    def record_timeoff_override(self, employee_id, ymd, timeoff_type_id, note, amount):
-        pass
+        return self._call("employees/%s/time_off/request" % employee_id, method='PUT', data=data, **options)
+
+    def add_timeoff_history_request(self, employee_id, ymd, request_id, **options):
+        """
+
+        :param employee_id: the employee id
+        :type employee_id: int
+        :param ymd: date of the history item, YYYY-MM-DD
+        :type ymd: str
+        :param request_id: the time off request id
+        :type request_id: int
+        :param options:
+        :return:
+        """
+        data = {'date': ymd, 'eventType': 'used', 'timeOffRequestId': request_id}
+        return self._call("employees/%s/time_off/history" % employee_id, method='PUT', data=data, **options)
+
+    def record_timeoff_override(self, employee_id, ymd, timeoff_type_id, note, amount, **options):
+        """
+
+        :param employee_id: the employee id
+        :type employee_id: int
+        :param ymd: date of the override, YYYY-MM-DD
+        :type ymd: str
+        :param timeoff_type_id: the time off type id
+        :type timeoff_type_id: int
+        :param note: the note
+        :type note: str
+        :param amount: the amount added (or subtracted when negative) to the balance
+        :type amount: float
+        :param options:
+        :return:
+        """
+        data = {'date': ymd, 'eventType': 'override', 'timeOffTypeId': timeoff_type_id, 'note': note, 'amount': amount}
+        return self._call("employees/%s/time_off/history" % employee_id, method='PUT', data=data, **options)
+
+    def _validate_timeoff_type(self, timeoff_type_id):
+        if str(timeoff_type_id) not in self.get_timeoff_type_ids():
+            raise ValueError("Unknown time off type {}".format(timeoff_type_id))
+
+    def bulk_add_timeoff_requests(self, requests, **bulk_options):
+        """
+        Adds many time off requests concurrently, see bamboopy.bulk.run_bulk for the options.
+        Timeouts are not retried, as the request may have been created, unless idempotent=True is given
+        :param requests: dicts with the arguments of add_timeoff_request
+        :type requests: list
+        :return: a list of BulkResult
+        """
+        def validate(item):
+            validate_date(item['start'], 'start')
+            validate_date(item['end'], 'end')
+            if str(item['start']) > str(item['end']):
+                raise ValueError("start {} is after end {}".format(item['start'], item['end']))
+            self._validate_timeoff_type(item['timeoff_type_id'])
+
+        self.get_timeoff_type_ids()
+        bulk_options.setdefault('idempotent', False)
+        return run_bulk(lambda x: self.add_timeoff_request(**x), requests, validate=validate, **bulk_options)
+
+    def bulk_add_timeoff_history(self, entries, **bulk_options):
+        """
+        :param entries: dicts with the arguments of add_timeoff_history_request
+        :type entries: list
+        :return: a list of BulkResult
+        """
+        bulk_options.setdefault('idempotent', False)
+        return run_bulk(lambda x: self.add_timeoff_history_request(**x), entries,
+                        validate=lambda x: validate_date(x['ymd'], 'ymd'), **bulk_options)
+
+    def bulk_record_timeoff_overrides(self, overrides, **bulk_options):
+        """
+        :param overrides: dicts with the arguments of record_timeoff_override
+        :type overrides: list
+        :return: a list of BulkResult
+        """
+        def validate(item):
+            validate_date(item['ymd'], 'ymd')
+            self._validate_timeoff_type(item['timeoff_type_id'])
+
+        self.get_timeoff_type_ids()
+        bulk_options.setdefault('idempotent', False)
+        return run_bulk(lambda x: self.record_timeoff_override(**x), overrides, validate=validate, **bulk_options)
+
+    def bulk_update_timeoff_request_status(self, updates, **bulk_options):
+        """
+        :param updates: dicts with the arguments of update_timeoff_request_status
+        :type updates: list
+        :return: a list of BulkResult
+        """
+        return run_bulk(lambda x: self.update_timeoff_request_status(**x), updates, **bulk_options)
 
     def update_table_row(self, employee_id, table_name, row_id, values):
         pass
@@ -209,8 +376,20 @@ class BambooHR(BaseClient):
         data = {'category': category_id, 'fileName': filename, 'share': 'yes' if share else 'no'}
         return self._call("employees/%s/files/" % employee_id, method='POST', data=data, files=file, **options)
 
-    def update_timeoff_request_status(self, request_id, status, note):
-        pass
+    def update_timeoff_request_status(self, request_id, status, note, **options):
+        """
+
+        :param request_id: the time off request id
+        :type request_id: int
+        :param status: approved, denied, declined, canceled...
+        :type status: str
+        :param note: note attached to the status change
+        :type note: str
+        :param options:
+        :return:
+        """
+        data = {'status': status, 'note': note}
+        return self._call("time_off/requests/%s/status" % request_id, method='PUT', data=data, **options)
 
     def upload_company_file(self, category_id, filename, file, share=False, **options):
         """
@@ -383,11 +562,7 @@ class BambooHR(BaseClient):
         pass
 
     def get_directory(self):
-        result = self._call('employees/directory')
-        if not result:
-            return
-
-        return Directory(result)
+        return self._call('employees/directory', resource=Directory)
 
     def download_employee_photo(self, employee_id, size='small', params=None, **options):
         """
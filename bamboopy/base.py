@@ -1,11 +1,15 @@
 import io
+import sys
 import gzip
 import json
 import time
 import base64
+import queue
+import socket
 import ntpath
 import logging
 import rfc6266
+import threading
 import mimetypes
 import traceback
 import xmltodict
@@ -13,7 +17,16 @@ from http import client
 from urllib import parse
 
 from bamboopy import logging_helper
-from bamboopy import BambooError, BambooBadRequest, BambooNotFound, BambooTimeout, BambooLimitExceeded, BambooNoPermissions, BambooUnauthorized, BambooServerError
+from bamboopy.latency import LatencyTracker, endpoint_key
+from bamboopy import BambooError, BambooBadRequest, BambooNotFound, BambooTimeout, BambooLimitExceeded, BambooNoPermissions, BambooUnauthorized, BambooServerError, BambooCircuitOpen
+
+# Errors of a keep-alive connection the server closed while it was idle
+stale_connection_errors = (client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class StaleConnection(Exception):
+    """A reused connection was found closed before any response was read"""
+
 
 xmltodict_opts = dict(
     attr_prefix='',
@@ -27,6 +40,22 @@ digest_map_func = {
 }
 
 
+def digest_result(data, status, content_type=None):
+    content_type = content_type or 'application/json'
+    if ';' in content_type:
+        content_type = content_type.split(';').pop(0)
+
+    if not data and 200 <= status < 300:
+        return True  # No data to display but was a success
+    elif not data:
+        return
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+
+    return digest_map_func.get(content_type, lambda x: x)(data)
+
+
 class BaseClient(object):
     """Abstract object for interacting with requests API"""
 
@@ -38,6 +67,7 @@ class BaseClient(object):
         self.company = company or extra_options.get('company')
         self.api_key = api_key or extra_options.get('api_key')
         self.log = logging_helper.get_log('bamboopy')
+        self.latencies = LatencyTracker()
 
         self.options = {'api_base': 'api.bamboohr.com', 'timeout': timeout}
         self.options.update(extra_options)
@@ -47,7 +77,7 @@ class BaseClient(object):
         connection_types = {'http': client.HTTPConnection, 'https': client.HTTPSConnection}
         parts = self.options['api_base'].split('://')
         protocol = (parts[0:-1]+['https'])[0]
-        self.options['connection_type'] = connection_types[protocol]
+        self.options['connection_type'] = self.options.get('transport') or connection_types[protocol]
         self.options['protocol'] = protocol
         self.options['api_base'] = parts[-1]
 
@@ -84,8 +114,9 @@ class BaseClient(object):
         return url, headers, data
 
     def _create_request(self, conn, method, url, headers, data):
+        started = time.monotonic()
         conn.request(method, url, data, headers)
-        params = {'method': method, 'url': url, 'data': data, 'headers': headers, 'host': conn.host, 'timeout': conn.timeout}
+        params = {'method': method, 'url': url, 'data': data, 'headers': headers, 'host': conn.host, 'timeout': conn.timeout, 'started': started}
         return params
 
     def _path_leaf(self, path):
@@ -140,15 +171,32 @@ class BaseClient(object):
             return self._gunzip_body(data)
         return data
 
-    def _execute_request_raw(self, conn, request):
+    def _open_connection(self, opts, kwargs, fresh=False):
+        pool = opts.get('connection_pool')
+        if pool:
+            return pool.acquire(opts['connection_type'], opts['api_base'], fresh=fresh, **kwargs)
+        return opts['connection_type'](opts['api_base'], **kwargs)
+
+    def _close_connection(self, conn, result):
+        # The pool the connection was acquired from, which may come from the options of the call
+        pool = getattr(conn, 'pool', None)
+        if pool and not getattr(result, 'will_close', True):
+            pool.release(conn)
+        else:
+            conn.close()
+
+    def _execute_request_raw(self, conn, request, close=None):
         try:
             result = conn.getresponse()
         except:
+            conn.close()
+            if getattr(conn, 'reused', False) and isinstance(sys.exc_info()[1], stale_connection_errors):
+                raise StaleConnection()
             raise BambooTimeout(None, request, traceback.format_exc())
 
         encoding = [i[1] for i in result.getheaders() if i[0].lower() == 'content-encoding']
         result.body = self._process_body(result.read(), len(encoding) and encoding[0] == 'gzip')
-        conn.close()
+        (close or self._close_connection)(conn, result)
 
         if result.status in (404, 410):
             raise BambooNotFound(result, request)
@@ -165,6 +213,126 @@ class BaseClient(object):
 
         return result
 
+    def _attempt_request(self, connection, endpoint, method, url, headers, data, close=None):
+        started = time.monotonic()
+        try:
+            request_info = self._create_request(connection, method, url, headers, data)
+        except stale_connection_errors:
+            connection.close()
+            if getattr(connection, 'reused', False):
+                raise StaleConnection()
+            raise
+        try:
+            result = self._execute_request_raw(connection, request_info, close)
+        except BambooTimeout as e:
+            # A timed out attempt says the latency is at least the timeout: recording it keeps
+            # slow endpoints from staying under a too tight adaptive timeout forever
+            if isinstance(e.__context__, socket.timeout) and connection.timeout:
+                self.latencies.record(endpoint, max(time.monotonic() - started, connection.timeout))
+            raise
+        self.latencies.record(endpoint, time.monotonic() - started)
+        return result
+
+    def _send_on_connection(self, opts, endpoint, method, url, headers, data, kwargs, opened=None, close=None):
+        """
+        Opens a connection, calling opened(connection), and sends the request through it,
+        calling close(connection, response) instead of _close_connection once it is read.
+        A pooled connection the server closed while idle fails before any response is read,
+        the request is then sent once more on a new connection, whatever the method.
+        """
+        connection = self._open_connection(opts, kwargs)
+        if opened:
+            opened(connection)
+        try:
+            return self._attempt_request(connection, endpoint, method, url, headers, data, close)
+        except StaleConnection:
+            self.log.debug("Idle connection to {} was closed, sending {} again".format(opts['api_base'], url))
+
+        connection = self._open_connection(opts, kwargs, fresh=True)
+        if opened:
+            opened(connection)
+        return self._attempt_request(connection, endpoint, method, url, headers, data, close)
+
+    def _send_request(self, opts, endpoint, method, url, headers, data, kwargs):
+        policy = opts.get('hedge_policy')
+        if policy and method == 'GET':
+            return self._send_hedged_request(policy, opts, endpoint, method, url, headers, data, kwargs)
+
+        return self._send_on_connection(opts, endpoint, method, url, headers, data, kwargs)
+
+    def _send_hedged_request(self, policy, opts, endpoint, method, url, headers, data, kwargs):
+        """
+        Send the request and, if it is slower than the policy delay, a second identical one.
+        The first successful response is returned and the connection of the other one closed.
+        """
+        policy.track_request()
+        delay = policy.delay(self.latencies, endpoint, kwargs.get('timeout'))
+        if delay is None:
+            return self._send_on_connection(opts, endpoint, method, url, headers, data, kwargs)
+
+        outcomes = queue.Queue()
+        # The connection of every attempt still reading its response, None once it is done.
+        # Once there is a winner the other attempts close their connection instead of putting
+        # it back in the pool, where another request could take it before the winner closes it.
+        connections = []
+        winner = []
+        lock = threading.Lock()
+
+        def attempt(index):
+            def opened(connection):
+                with lock:
+                    connections[index] = connection
+
+            def close(connection, result):
+                with lock:
+                    connections[index] = None
+                    abandoned = winner and winner[0] != index
+                if abandoned:
+                    connection.close()
+                else:
+                    self._close_connection(connection, result)
+
+            try:
+                result = self._send_on_connection(opts, endpoint, method, url, headers, data, kwargs, opened, close)
+                outcomes.put((index, result, None))
+            except Exception as e:
+                outcomes.put((index, None, e))
+
+        def start_attempt():
+            with lock:
+                connections.append(None)
+                index = len(connections) - 1
+            threading.Thread(target=attempt, args=(index,), daemon=True).start()
+
+        start_attempt()
+        pending = 1
+        hedged = False
+        error = None
+        while pending:
+            try:
+                index, result, e = outcomes.get(timeout=None if hedged else delay)
+            except queue.Empty:
+                hedged = True
+                # The hedge is one more request for the rate limit, skipped when there is no token left
+                limiter = opts.get('rate_limiter')
+                if policy.acquire() and (not limiter or not limiter.try_acquire()):
+                    self.log.debug("Hedging {} after {:.3f}s".format(url, delay))
+                    start_attempt()
+                    pending += 1
+                continue
+
+            pending -= 1
+            if e is None:
+                with lock:
+                    winner.append(index)
+                    running = [c for i, c in enumerate(connections) if i != index and c is not None]
+                for connection in running:
+                    connection.close()
+                return result
+            error = error or e
+
+        raise error
+
     def _execute_request(self, conn, request):
         result = self._execute_request_raw(conn, request)
         return result.body
@@ -185,25 +353,26 @@ class BaseClient(object):
         }
 
     def _digest_result(self, data, status, content_type=None):
-        content_type = content_type or 'application/json'
-        if ';' in content_type:
-            content_type = content_type.split(';').pop(0)
-
-        if not data and 200 <= status < 300:
-            return True  # No data to display but was a success
-        elif not data:
-            return
-
-        if isinstance(data, bytes):
-            data = data.decode('utf-8')
-
-        return digest_map_func.get(content_type, lambda x: x)(data)
+        return digest_result(data, status, content_type)
 
     def _call_raw(self, subpath, params=None, method='GET', data=None, files=None, doseq=False, query='', retried=False, **options):
+        try:
+            return self._call_raw_attempts(subpath, params, method, data, files, doseq, query, **options)
+        except BambooError as e:
+            # The frames of the traceback reference the whole response and request payload,
+            # which errors collected by bulk jobs would otherwise keep alive
+            traceback.clear_frames(e.__traceback__)
+            raise
+
+    def _call_raw_attempts(self, subpath, params, method, data, files, doseq, query, **options):
         opts = self.options.copy()
         opts.update(options)
         url, headers, data = self._prepare_request(subpath, params, data, opts, files, doseq, query)
+        endpoint = endpoint_key(method, subpath)
         kwargs = {'timeout': opts['timeout']}
+        if opts.get('adaptive_timeout'):
+            kwargs['timeout'] = opts['adaptive_timeout'].timeout(self.latencies, endpoint, opts['timeout'])
+        breaker = opts.get('circuit_breakers') and opts['circuit_breakers'].get(opts['api_base'], endpoint)
         num_retries = opts.get('number_retries', 0)
 
         if method != 'GET' and not opts.get('retry_on_post'):
@@ -218,16 +387,25 @@ class BaseClient(object):
             # avoid getting burned by any mistakes in While loop logic
             if emergency_brake < 1:
                 break
+            if breaker and not breaker.allow():
+                request_info = {'method': method, 'url': url, 'host': opts['api_base'], 'timeout': kwargs['timeout']}
+                raise BambooCircuitOpen(None, request_info, "Circuit open for {}".format(endpoint))
+            if opts.get('rate_limiter'):
+                opts['rate_limiter'].acquire()
             try:
                 try_count += 1
-                connection = opts['connection_type'](opts['api_base'], **kwargs)
-                request_info = self._create_request(connection, method, url, headers, data)
-                result = self._execute_request_raw(connection, request_info)
+                result = self._send_request(opts, endpoint, method, url, headers, data, kwargs)
+                if breaker:
+                    breaker.record_success()
                 break
             except BambooUnauthorized as e:
+                if breaker:
+                    breaker.record_success()
                 self.log.warning("401 Unauthorized response to API request.")
                 raise
             except BambooError as e:
+                if breaker:
+                    self._record_breaker_outcome(breaker, e)
                 if try_count > num_retries:
                     logging.warning("Too many retries for {}".format(url))
                     raise
@@ -235,19 +413,41 @@ class BaseClient(object):
                 if e.result and 300 <= e.result.status < 500:
                     raise
 
-                self._prepare_request_retry(method, url, headers, data)
+                self._prepare_request_retry(method, url, headers, data, files)
                 self.log.warning("BambooError {} calling {}, retrying".format(e, url))
+            except Exception:
+                if breaker:
+                    breaker.record_failure()
+                raise
             # exponential back off - wait 0 seconds, 1 second, 3 seconds, 7 seconds, 15 seconds, etc
             time.sleep((pow(2, try_count - 1) - 1 * self.sleep_multiplier))
 
         return result
 
-    def _call(self, subpath, params=None, method='GET', data=None, files=None, doseq=False, query='', **options):
+    def _record_breaker_outcome(self, breaker, error):
+        # Only timeouts and server errors tell that the endpoint is unhealthy
+        if isinstance(error, (BambooTimeout, BambooServerError)):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def _hydrate(self, result, resource=None):
+        if not result:
+            return
+        return resource(result) if resource else result
+
+    def _call(self, subpath, params=None, method='GET', data=None, files=None, doseq=False, query='', resource=None, **options):
         result = self._call_raw(subpath, params=params, method=method, data=data, files=files, doseq=doseq, query=query, retried=False, **options)
         content_type = [i[1] for i in result.getheaders() if i[0].lower() == 'content-type']
         content_disposition = [i[1] for i in result.getheaders() if i[0].lower() == 'content-disposition']
+        content_type = content_type[0] if len(content_type) else None
         body = result.body
         if len(content_disposition) and 'attachment' in content_disposition[0]:
             body = self._digest_binary(result.body, result.getheaders())
 
-        return self._digest_result(body, status=result.status, content_type=content_type[0] if len(content_type) else None)
+        parse_pool = options.get('parse_pool', self.options.get('parse_pool'))
+        if parse_pool and parse_pool.offloads(body):
+            return parse_pool.digest(body, result.status, content_type, resource)
+
+        result = self._digest_result(body, status=result.status, content_type=content_type)
+        return self._hydrate(result, resource) if resource else result
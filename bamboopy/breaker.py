@@ -0,0 +1,156 @@
+import time
+import threading
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling an endpoint after `failure_threshold` consecutive failures. Once
+    `recovery_timeout` seconds have passed a limited number of probe calls are let
+    through (half-open) and `success_threshold` successes close the circuit again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, success_threshold=1, half_open_max_calls=1):
+        """
+        :param failure_threshold: consecutive failures that open the circuit
+        :type failure_threshold: int
+        :param recovery_timeout: seconds the circuit stays open before probing again
+        :type recovery_timeout: float
+        :param success_threshold: successful probes needed to close the circuit
+        :type success_threshold: int
+        :param half_open_max_calls: concurrent probes allowed while half-open
+        :type half_open_max_calls: int
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.success_threshold = success_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._probes = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._successes = 0
+            self._probes = 0
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._failures = 0
+
+    def allow(self):
+        """Returns whether a call can be made right now"""
+        with self._lock:
+            self._update_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+                self._successes += 1
+                if self._successes >= self.success_threshold:
+                    self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+
+            self._failures += 1
+            if self._state == self.CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+
+class CircuitBreakers(object):
+    """Registry of circuit breakers, one per endpoint (or per host when scope is 'host')"""
+
+    def __init__(self, scope='endpoint', **breaker_options):
+        """
+        :param scope: 'endpoint' or 'host'
+        :type scope: str
+        :param breaker_options: options for every CircuitBreaker created
+        """
+        if scope not in ('endpoint', 'host'):
+            raise ValueError("Unknown circuit breaker scope {}".format(scope))
+
+        self.scope = scope
+        self.breaker_options = breaker_options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, endpoint):
+        key = host if self.scope == 'host' else '{} {}'.format(host, endpoint)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(**self.breaker_options)
+            return breaker
+
+    def states(self):
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {key: breaker.state for key, breaker in breakers}
+
+
+class AdaptiveTimeout(object):
+    """
+    Derives the timeout of each endpoint from its observed latencies: `multiplier` times
+    the `percentile` latency, bounded by `min_timeout` and `max_timeout`. Timed out attempts
+    count as samples of the timeout they hit, so the timeout grows for endpoints slower than
+    it, starting from the static one, and tightens again when latency drops.
+    """
+
+    def __init__(self, percentile=99, multiplier=3, min_timeout=1, max_timeout=120, min_samples=20):
+        """
+        :param percentile: latency percentile the timeout is based on
+        :type percentile: float
+        :param multiplier: head room applied over the percentile latency
+        :type multiplier: float
+        :param min_timeout: lower bound, in seconds
+        :type min_timeout: float
+        :param max_timeout: upper bound, in seconds
+        :type max_timeout: float
+        :param min_samples: number of samples needed before replacing the static timeout
+        :type min_samples: int
+        """
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+
+    def timeout(self, latencies, endpoint, default):
+        """
+        :param latencies: the tracker with the recent latencies of the client
+        :type latencies: bamboopy.latency.LatencyTracker
+        :param endpoint: the endpoint key
+        :param default: the static timeout, used until there are enough samples
+        :return: the timeout in seconds
+        """
+        if latencies.count(endpoint) < self.min_samples:
+            return default
+
+        timeout = latencies.percentile(endpoint, self.percentile) * self.multiplier
+        return min(max(timeout, self.min_timeout), self.max_timeout)
@@ -0,0 +1,94 @@
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from bamboopy import logging_helper
+from bamboopy import BambooTimeout, BambooServerError, BambooLimitExceeded
+
+transient_errors = (BambooTimeout, BambooServerError, BambooLimitExceeded)
+
+log = logging_helper.get_log('bamboopy.bulk')
+
+
+class BulkResult(object):
+    """Outcome of one item of a bulk operation"""
+
+    def __init__(self, index, item, result=None, error=None, attempts=0):
+        self.index = index
+        self.item = item
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return '<BulkResult {} {} attempts={}>'.format(self.index, 'ok' if self.ok else repr(self.error), self.attempts)
+
+
+def validate_date(value, name='date'):
+    try:
+        datetime.strptime(str(value), '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("{} must be a YYYY-MM-DD date, got {}".format(name, value))
+
+
+def _retryable(error, idempotent):
+    """
+    Whether a call can be sent again after error. Calls that create records are only retried
+    when the server surely did not process them (rate limited or unavailable): after a
+    timeout or another server error the record may exist already.
+    """
+    if idempotent:
+        return True
+    return isinstance(error, BambooLimitExceeded) or error.status == 503
+
+
+def run_bulk(func, items, validate=None, max_workers=8, rate_limiter=None, retries=3, backoff=1, idempotent=True):
+    """
+    Calls func(item) for every item concurrently, retrying transient errors (timeouts,
+    server errors and rate limiting) with exponential back off, or after the Retry-After
+    of the response when it is longer.
+    :param func: the call to make for every item
+    :param items: the items
+    :type items: list
+    :param validate: optional callable raising for invalid items, which are not sent
+    :param max_workers: calls made at the same time
+    :type max_workers: int
+    :param rate_limiter: optional limiter every attempt goes through
+    :type rate_limiter: bamboopy.ratelimit.RateLimiter
+    :param retries: retries of an item after a transient error
+    :type retries: int
+    :param backoff: seconds waited before the first retry, doubled on each one
+    :type backoff: float
+    :param idempotent: whether func can be sent twice for an item, otherwise only 429 and 503 are retried
+    :type idempotent: bool
+    :return: a list of BulkResult, in the order of the items
+    """
+    def run(index, item):
+        if validate:
+            try:
+                validate(item)
+            except Exception as e:
+                return BulkResult(index, item, error=e)
+
+        attempts = 0
+        while True:
+            attempts += 1
+            if rate_limiter:
+                rate_limiter.acquire()
+            try:
+                return BulkResult(index, item, result=func(item), attempts=attempts)
+            except transient_errors as e:
+                if attempts > retries or not _retryable(e, idempotent):
+                    return BulkResult(index, item, error=e, attempts=attempts)
+                log.debug("Retrying item {} after {!r}".format(index, e))
+                time.sleep(max(backoff * pow(2, attempts - 1), e.retry_after or 0))
+            except Exception as e:
+                return BulkResult(index, item, error=e, attempts=attempts)
+
+    items = list(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, range(len(items)), items))
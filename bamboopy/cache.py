@@ -0,0 +1,124 @@
+import threading
+from datetime import datetime, timezone
+
+from bamboopy import BambooNotFound
+from bamboopy.converters import field_types
+
+
+def employee_key(employee_id):
+    """Normalizes employee ids, which come as '12', 12 or 12.0 depending on the endpoint"""
+    return str(int(float(employee_id)))
+
+
+class EmployeeCache(object):
+    """
+    In-memory cache of employees seeded from the directory. Entries can be invalidated or
+    refetched one by one (e.g. from webhook notifications) instead of pulling everything again.
+    """
+
+    def __init__(self, client, fields=None):
+        """
+        :param client: the client used to fetch employees
+        :type client: bamboopy.BambooHR
+        :param fields: field ids to fetch when refetching an employee, defaults to the directory fields
+        :type fields: list
+        """
+        self.client = client
+        self.fields = fields
+        self.directory = None
+        self.timestamp = None
+        self._employees = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._employees)
+
+    def __contains__(self, employee_id):
+        with self._lock:
+            return employee_key(employee_id) in self._employees
+
+    def _schema(self):
+        # Refetched employees are typed like the ones of the directory the cache was seeded with
+        if self.directory is not None:
+            return field_types(self.directory.fields)
+
+    def _fields(self):
+        if self.fields:
+            return self.fields
+        if self.directory is not None:
+            return [field.id for field in self.directory.fields]
+
+    def refresh(self):
+        """Reloads every employee from the directory"""
+        directory = self.client.get_directory()
+        self.load(directory)
+        return directory
+
+    def load(self, directory, timestamp=None):
+        """
+        Seeds the cache from an already fetched (or loaded) Directory or Report
+        :param directory: the resource with the employees
+        :param timestamp: when the data was fetched, defaults to the time of the snapshot it was
+            loaded from, or now
+        :type timestamp: datetime
+        """
+        employees = {employee_key(employee.id): employee for employee in directory.employees}
+        with self._lock:
+            self.directory = directory
+            self._employees = employees
+            self.timestamp = timestamp or getattr(directory, 'snapshot_timestamp', None) or datetime.now(timezone.utc)
+
+    def get(self, employee_id):
+        """Returns the cached employee, fetching it when missing"""
+        key = employee_key(employee_id)
+        with self._lock:
+            employee = self._employees.get(key)
+        if employee is None:
+            employee = self.refetch([key]).get(key)
+        return employee
+
+    def put(self, employee):
+        with self._lock:
+            self._employees[employee_key(employee.id)] = employee
+
+    def employees(self):
+        with self._lock:
+            return list(self._employees.values())
+
+    def invalidate(self, employee_ids=None):
+        """
+        :param employee_ids: the employees to drop, all of them when None
+        :type employee_ids: list
+        """
+        with self._lock:
+            if employee_ids is None:
+                self._employees = {}
+                self.timestamp = None
+                return
+
+            for employee_id in employee_ids:
+                self._employees.pop(employee_key(employee_id), None)
+
+    def refetch(self, employee_ids):
+        """
+        Fetches again only the given employees, the ones that no longer exist are dropped
+        :param employee_ids: the employee ids
+        :type employee_ids: list
+        :return: a dict of employee id => Employee with the refetched employees
+        """
+        fetched = {}
+        fields, schema = self._fields(), self._schema()
+        for employee_id in employee_ids:
+            key = employee_key(employee_id)
+            try:
+                employee = self.client.get_employee(key, fields, schema=schema)
+            except BambooNotFound:
+                employee = None
+
+            with self._lock:
+                if employee:
+                    self._employees[key] = fetched[key] = employee
+                else:
+                    self._employees.pop(key, None)
+        return fetched
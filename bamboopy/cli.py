@@ -0,0 +1,290 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bamboopy import BambooError
+from bamboopy.bamboohr import BambooHR
+from bamboopy.ratelimit import RateLimiter
+
+
+def _dumps(value):
+    return json.dumps(value, default=str, separators=(',', ':'))
+
+
+class NdjsonWriter(object):
+    """One json object per line"""
+
+    def __init__(self, path, columns=None):
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        self.file.write(_dumps(row) + '\n')
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class CsvWriter(object):
+    """CSV with a header, columns default to the ones of the first row"""
+
+    def __init__(self, path, columns=None):
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        self.columns = columns
+        self.writer = None
+
+    def write(self, row):
+        if self.writer is None:
+            self.columns = self.columns or list(row)
+            self.writer = csv.DictWriter(self.file, self.columns, restval='', extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerow({k: v if isinstance(v, (str, int, float)) or v is None else str(v) for k, v in row.items()})
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class ColumnarWriter(object):
+    """
+    A directory with one file per column, each holding one json value per line, plus a
+    columns.json manifest. Columns appearing late are backfilled with nulls.
+    """
+
+    def __init__(self, path, columns=None):
+        if path == '-':
+            raise ValueError("The columnar format needs an output directory")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self.files = {}
+        for column in columns or []:
+            self._open(column)
+
+    def _open(self, column):
+        name = '{:04d}.ndjson'.format(len(self.files))
+        file = open(os.path.join(self.path, name), 'w', encoding='utf-8')
+        file.write('null\n' * self.rows)
+        self.files[column] = (name, file)
+
+    def write(self, row):
+        for column in row:
+            if column not in self.files:
+                self._open(column)
+        for column, (_, file) in self.files.items():
+            file.write(_dumps(row.get(column)) + '\n')
+        self.rows += 1
+
+    def close(self):
+        manifest = {'rows': self.rows, 'columns': [{'name': c, 'file': n} for c, (n, _) in self.files.items()]}
+        for _, file in self.files.values():
+            file.close()
+        with open(os.path.join(self.path, 'columns.json'), 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+
+
+writers = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+    'columns': ColumnarWriter,
+}
+
+
+class Progress(object):
+    """Progress and throughput reporting on stderr"""
+
+    def __init__(self, quiet=False, interval=1.0):
+        self.quiet = quiet
+        self.interval = interval
+        self.rows = 0
+        self.requests = 0
+        self.errors = 0
+        self.done = 0
+        self.total = None
+        self.started = time.monotonic()
+        self._printed = self.started
+        self._lock = threading.Lock()
+
+    def update(self, rows=0, requests=0, errors=0, done=0):
+        with self._lock:
+            self.rows += rows
+            self.requests += requests
+            self.errors += errors
+            self.done += done
+            now = time.monotonic()
+            if self.quiet or now - self._printed < self.interval:
+                return
+            self._printed = now
+        total = '/{}'.format(self.total) if self.total else ''
+        sys.stderr.write('\r{}{} done, {} rows, {} errors'.format(self.done, total, self.rows, self.errors))
+        sys.stderr.flush()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        if not self.quiet and self._printed > self.started:
+            sys.stderr.write('\n')
+        sys.stderr.write('{} rows, {} requests, {} errors in {:.1f}s ({:.1f} rows/s, {:.1f} requests/s)\n'.format(
+            self.rows, self.requests, self.errors, elapsed,
+            self.rows / elapsed if elapsed else 0, self.requests / elapsed if elapsed else 0))
+
+
+def employee_row(employee):
+    row = {'id': employee._raw.get('id')}
+    row.update(employee.fields)
+    return row
+
+
+def table_rows(result):
+    """Rows of a get_table result, either json (a list) or xml ({'table': {'row': ...}})"""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        rows = (result.get('table') or {}).get('row') or []
+        return rows if isinstance(rows, list) else [rows]
+    return []
+
+
+def file_rows(employee_id, categories):
+    for category in categories or []:
+        for file in category.files:
+            yield {
+                'employeeId': employee_id,
+                'categoryId': category.id,
+                'categoryName': category.name,
+                'fileId': file.id,
+                'name': file.name,
+                'originalFileName': file.original_file_name,
+                'size': file.size,
+                'dateCreated': file.date_created,
+                'createdBy': file.created_by,
+                'shareWithEmployee': file.share_with_employee,
+            }
+
+
+def export_employees(resource, writer, progress):
+    for employee in resource.employees:
+        writer.write(employee_row(employee))
+        progress.update(rows=1)
+
+
+def export_per_employee(client, employee_ids, fetch, writer, progress, workers):
+    """Runs fetch(client, employee_id) in parallel, writing the rows as each one finishes"""
+    progress.total = len(employee_ids)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, client, x): x for x in employee_ids}
+        for future in as_completed(futures):
+            try:
+                rows = future.result()
+            except Exception as e:
+                # Connection errors and unexpected payloads fail the employee, not the export
+                sys.stderr.write('\nEmployee {} failed: {!r}\n'.format(futures[future], e))
+                progress.update(requests=1, errors=1, done=1)
+                continue
+
+            for row in rows:
+                writer.write(row)
+            progress.update(rows=len(rows), requests=1, done=1)
+
+
+def _employee_ids(client, args, progress):
+    if args.employees:
+        return [x.strip() for x in args.employees.split(',') if x.strip()]
+
+    directory = client.get_directory()
+    progress.update(requests=1)
+    return [employee._raw.get('id') for employee in directory.employees]
+
+
+def run(args):
+    limiter = RateLimiter(args.rate, args.burst) if args.rate else None
+    client = BambooHR(api_key=args.api_key, company=args.company, timeout=args.timeout,
+                      number_retries=args.retries, rate_limiter=limiter)
+    progress = Progress(quiet=args.quiet)
+    writer = None
+
+    try:
+        if args.command == 'directory':
+            directory = client.get_directory()
+            progress.update(requests=1)
+            writer = writers[args.format](args.output, ['id'] + [x.id for x in directory.fields])
+            export_employees(directory, writer, progress)
+        elif args.command == 'report':
+            fields = [x.strip() for x in args.fields.split(',') if x.strip()]
+            report = client.get_custom_report('json', fields, title=args.title or '')
+            progress.update(requests=1)
+            writer = writers[args.format](args.output, ['id'] + fields)
+            export_employees(report, writer, progress)
+        elif args.command == 'tables':
+            ids = _employee_ids(client, args, progress)
+            writer = writers[args.format](args.output)
+
+            def fetch(client, employee_id):
+                rows = table_rows(client.get_table(employee_id, args.table))
+                return [dict(row, employeeId=row.get('employeeId', employee_id)) for row in rows]
+            export_per_employee(client, ids, fetch, writer, progress, args.workers)
+        elif args.command == 'files':
+            ids = _employee_ids(client, args, progress)
+            writer = writers[args.format](args.output, ['employeeId', 'categoryId', 'categoryName', 'fileId', 'name',
+                                                        'originalFileName', 'size', 'dateCreated', 'createdBy',
+                                                        'shareWithEmployee'])
+
+            def fetch(client, employee_id):
+                return list(file_rows(employee_id, client.list_employee_files(employee_id, content_type='application/xml')))
+            export_per_employee(client, ids, fetch, writer, progress, args.workers)
+    finally:
+        if writer:
+            writer.close()
+        progress.summary()
+
+    return 1 if progress.errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='bamboopy', description="Bulk export of BambooHR data")
+    parser.add_argument('--company', default=os.environ.get('BAMBOOHR_COMPANY'), help="company subdomain (BAMBOOHR_COMPANY)")
+    parser.add_argument('--api-key', default=os.environ.get('BAMBOOHR_API_KEY'), help="api key (BAMBOOHR_API_KEY)")
+    parser.add_argument('--format', choices=sorted(writers), default='ndjson')
+    parser.add_argument('--output', '-o', default='-', help="output file, or directory for columns, '-' for stdout")
+    parser.add_argument('--workers', type=int, default=4, help="parallel per-employee requests")
+    parser.add_argument('--rate', type=float, default=None, help="maximum requests per second")
+    parser.add_argument('--burst', type=float, default=None, help="requests allowed at once under --rate")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--retries', type=int, default=2, help="retries of failed GET requests")
+    parser.add_argument('--quiet', '-q', action='store_true', help="no progress output")
+
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    commands.add_parser('directory', help="the employee directory")
+    report = commands.add_parser('report', help="a custom report")
+    report.add_argument('--fields', required=True, help="comma separated field ids or aliases")
+    report.add_argument('--title')
+    tables = commands.add_parser('tables', help="a table of every employee")
+    tables.add_argument('--table', required=True, help="the table name, e.g. jobInfo")
+    tables.add_argument('--employees', help="comma separated employee ids, all of the directory by default")
+    files = commands.add_parser('files', help="the file inventory of every employee")
+    files.add_argument('--employees', help="comma separated employee ids, all of the directory by default")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.company or not args.api_key:
+        sys.stderr.write("--company and --api-key (or BAMBOOHR_COMPANY and BAMBOOHR_API_KEY) are required\n")
+        return 2
+
+    try:
+        return run(args)
+    except BambooError as e:
+        sys.stderr.write("Export failed: {!r}\n".format(e))
+        return 1
+    except KeyboardInterrupt:
+        return 130
@@ -0,0 +1,150 @@
+import functools
+from decimal import Decimal
+from datetime import datetime
+from collections import namedtuple
+
+Money = namedtuple('Money', ['amount', 'currency'])
+
+empty_dates = ('', '0000-00-00', '0000-00-00 00:00:00')
+true_values = ('yes', 'true', '1', 'on')
+false_values = ('no', 'false', '0', 'off', '')
+datetime_formats = ('%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%d %H:%M:%S%z', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S')
+
+
+def to_date(value):
+    if value in empty_dates:
+        return
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def to_datetime(value):
+    if value in empty_dates:
+        return
+    if value.endswith('Z'):
+        value = value[:-1] + '+0000'
+    elif len(value) > 6 and value[-3] == ':' and value[-6] in '+-':
+        value = value[:-3] + value[-2:]
+
+    for format in datetime_formats:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    raise ValueError("Unknown datetime format {}".format(value))
+
+
+def to_currency(value):
+    """'75000.00 USD' or {'value': '75000.00', 'currency': 'USD'} into Money"""
+    if isinstance(value, dict):
+        return Money(Decimal(value.get('value') or 0), value.get('currency'))
+
+    parts = value.split()
+    if not parts:
+        return
+    return Money(Decimal(parts[0].replace(',', '')), parts[1] if len(parts) > 1 else None)
+
+
+def to_percentage(value):
+    value = value.strip().rstrip('%')
+    return Decimal(value) if value else None
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+
+    value = str(value).strip().lower()
+    if value in true_values:
+        return True
+    if value in false_values:
+        return False
+    raise ValueError("Unknown boolean value {}".format(value))
+
+
+def to_list(value):
+    # A single option comes as a plain string, multiple options as a list
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return str(value)
+
+
+prop_type_map = {
+    'text': str,
+    'textarea': str,
+    'integer': int,
+    'int': int,
+    'list': to_list,
+    'date': to_date,
+    'datetime': to_datetime,
+    'timestamp': to_datetime,
+    'currency': to_currency,
+    'percentage': to_percentage,
+    'bool': to_bool,
+    'checkbox': to_bool,
+}
+
+
+def field_types(fields):
+    """
+    :param fields: the Field list returned by get_fields
+    :return: a dict of field id and alias => field type, usable as schema of compile_converter
+    """
+    types = {}
+    for field in fields:
+        for key in (field.id, getattr(field, 'alias', None)):
+            if key is not None:
+                types[str(key)] = field.type
+    return types
+
+
+def _safe(convert):
+    def converter(value):
+        try:
+            return convert(value)
+        except (TypeError, ValueError, ArithmeticError):
+            return value  # keep what the API sent rather than losing it
+    return converter
+
+
+class Converter(object):
+    """Converts a raw employee into its typed fields dict in a single pass"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self._steps = tuple((key, _safe(prop_type_map.get(type, str)) if type else None) for key, type in plan)
+
+    def __call__(self, raw):
+        get = raw.get
+        result = {}
+        for key, converter in self._steps:
+            value = get(key)
+            result[key] = value if converter is None or value is None else converter(value)
+        return result
+
+    def __reduce__(self):
+        return _compile, (self.plan,)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(plan):
+    return Converter(plan)
+
+
+def compile_converter(fields, schema=None):
+    """
+    Compiles, once per field list, the function turning a raw employee into its typed fields dict
+    :param fields: Field objects or field ids/aliases
+    :type fields: list
+    :param schema: field id/alias => type for the fields given as ids, see field_types
+    :type schema: dict
+    :return: a callable receiving the raw employee dict
+    """
+    schema = schema or {}
+    plan = []
+    for field in fields or []:
+        if isinstance(field, (str, int)):
+            key = str(field)
+            plan.append((key, schema.get(key)))
+        else:
+            plan.append((field.id, field.type or 'text'))
+    return _compile(tuple(plan))
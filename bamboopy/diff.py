@@ -0,0 +1,112 @@
+import json
+import hashlib
+from collections import namedtuple
+
+from bamboopy.cache import employee_key
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# field is None for whole rows added or removed, old/new are then the row values
+Change = namedtuple('Change', ['kind', 'key', 'field', 'old', 'new'])
+
+
+def fingerprint(values):
+    """
+    Stable hash of a row, independent of the key order and of the process (unlike hash())
+    :param values: field => value
+    :type values: dict
+    :return: 16 bytes digest
+    """
+    canonical = json.dumps(values, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+def employee_rows(source):
+    """
+    :param source: a Directory, a Report or an iterable of employees
+    :return: a generator of (employee id, fields dict)
+    """
+    employees = getattr(source, 'employees', source)
+    for employee in employees:
+        yield employee_key(employee.id), employee.fields
+
+
+def table_rows(rows, key='id'):
+    """
+    :param rows: table rows as dicts
+    :param key: the field identifying a row
+    :return: a generator of (row key, row dict)
+    """
+    for row in rows:
+        yield str(row[key]), row
+
+
+def fingerprints(rows):
+    """
+    :param rows: iterable of (key, values), see employee_rows and table_rows
+    :return: a dict of key => fingerprint, can be kept to detect changed keys later
+    """
+    return {key: fingerprint(values) for key, values in rows}
+
+
+def _field_changes(key, old, new):
+    for field, value in new.items():
+        if field not in old:
+            yield Change(ADDED, key, field, None, value)
+        elif old[field] != value:
+            yield Change(CHANGED, key, field, old[field], value)
+    for field, value in old.items():
+        if field not in new:
+            yield Change(REMOVED, key, field, value, None)
+
+
+def diff_rows(old, new):
+    """
+    Compares two sets of rows in linear time. Rows with the same fingerprint are skipped
+    without comparing their fields.
+    :param old: iterable of (key, values) of the previous pull
+    :param new: iterable of (key, values) of the current pull
+    :return: a generator of Change, field-level for changed rows
+    """
+    previous = {}
+    for key, values in old:
+        previous[key] = (fingerprint(values), values)
+
+    for key, values in new:
+        entry = previous.pop(key, None)
+        if entry is None:
+            yield Change(ADDED, key, None, None, values)
+        elif entry[0] != fingerprint(values):
+            for change in _field_changes(key, entry[1], values):
+                yield change
+
+    for key, (_, values) in previous.items():
+        yield Change(REMOVED, key, None, values, None)
+
+
+def diff(old, new):
+    """
+    Field-level changes between two pulls of employees
+    :param old: the previous Directory, Report or list of employees
+    :param new: the current Directory, Report or list of employees
+    :return: a generator of Change
+    """
+    return diff_rows(employee_rows(old), employee_rows(new))
+
+
+def changed_keys(old_fingerprints, rows):
+    """
+    Keys added or changed since the fingerprints were taken, without needing the old rows
+    :param old_fingerprints: the result of fingerprints() for the previous pull
+    :param rows: iterable of (key, values) of the current pull
+    :return: a tuple (added or changed keys, removed keys)
+    """
+    seen = set()
+    changed = []
+    for key, values in rows:
+        seen.add(key)
+        if old_fingerprints.get(key) != fingerprint(values):
+            changed.append(key)
+    return changed, [key for key in old_fingerprints if key not in seen]
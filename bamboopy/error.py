@@ -1,18 +1,74 @@
+import time
+from email.utils import parsedate_to_datetime
+
+MAX_BODY = 2048
+MAX_ERROR = 4096
+REDACTED_HEADERS = ('authorization',)
+
+
+def _truncate(value, limit, tail=False):
+    """
+    Returns the value cut to `limit` characters (or bytes) and its original size
+    :param tail: keep the end of the value rather than its start
+    """
+    if value is None:
+        return None, 0
+    if not isinstance(value, (str, bytes, bytearray)):
+        value = str(value)
+    size = len(value)
+    if size > limit:
+        value = value[-limit:] if tail else value[:limit]
+    return bytes(value) if isinstance(value, bytearray) else value, size
+
+
 class EmptyResult(object):
     def __init__(self):
         self.status = 0
         self.body = ''
+        self.body_size = 0
         self.msg = ''
         self.reason = ''
+        self.headers = []
+
+    def getheaders(self):
+        return self.headers
 
     def __nonzero__(self):
         return False
 
+    __bool__ = __nonzero__
+
+
+class ResultSummary(object):
+    """
+    Bounded copy of a response kept by errors, so that they neither hold the connection
+    nor the whole body
+    """
+
+    def __init__(self, result, max_body=MAX_BODY):
+        self.status = getattr(result, 'status', 0)
+        self.reason = getattr(result, 'reason', '')
+        self.headers = list(result.getheaders()) if hasattr(result, 'getheaders') else []
+        self.body, self.body_size = _truncate(getattr(result, 'body', None), max_body)
+
+    @property
+    def msg(self):
+        return self.reason
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        for key, value in self.headers:
+            if key.lower() == name.lower():
+                return value
+        return default
+
 
 class BambooError(ValueError):
     as_str_template = u'''
     ---- request ----
-    {method} {host}{url}, [timeout={timeout}]
+    {method} {host}{url}, [timeout={timeout}, elapsed={elapsed}]
     ---- body ----
     {body}
     ---- headers ----
@@ -29,43 +85,95 @@ class BambooError(ValueError):
     {error}
     '''
 
+    max_body = MAX_BODY
+
     def __init__(self, result, request, err=None):
         super(BambooError, self).__init__(result and result.reason or "Unknown Reason")
         if result is None:
             self.result = EmptyResult()
-        else:
+        elif isinstance(result, (EmptyResult, ResultSummary)):
             self.result = result
-        if request is None:
-            request = {}
-
-        self.request = request
-        self.err = err
+        else:
+            self.result = ResultSummary(result, self.max_body)
+
+        request = request or {}
+        started = request.get('started')
+        self.elapsed = time.monotonic() - started if started else None
+        self.request = self._bound_request(request)
+        # The end of a traceback holds the exception itself
+        self.err, _ = _truncate(err, MAX_ERROR, tail=True) if isinstance(err, (str, bytes)) else (err, 0)
+
+    def _bound_request(self, request):
+        """Keeps what describes the request and drops its payload, which can be a whole upload"""
+        bounded = {key: request.get(key) for key in ('method', 'host', 'url', 'timeout')}
+        headers = request.get('headers') or {}
+        bounded['headers'] = {k: v for k, v in headers.items() if k.lower() not in REDACTED_HEADERS}
+        bounded['data'], bounded['data_size'] = _truncate(request.get('data'), self.max_body)
+        return bounded
+
+    @property
+    def status(self):
+        return self.result.status
+
+    @property
+    def endpoint(self):
+        url = (self.request.get('url') or '').split('?')[0]
+        return '{} {}'.format(self.request.get('method') or '', url).strip()
+
+    @property
+    def retry_after(self):
+        """Seconds to wait before retrying, from the Retry-After header, if any"""
+        value = self.result.getheader('Retry-After') if hasattr(self.result, 'getheader') else None
+        if not value:
+            return
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return
 
     def __str__(self):
-        return self.__unicode__().encode('ascii', 'replace')
+        return self.__unicode__()
+
+    def __repr__(self):
+        return '{}({!r}, status={}, endpoint={!r})'.format(self.__class__.__name__, self.args[0] if self.args else '',
+                                                           self.status, self.endpoint)
 
     def __unicode__(self):
         params = {}
-        request_keys = ('method', 'host', 'url', 'data', 'headers', 'timeout', 'body')
+        request_keys = ('method', 'host', 'url', 'headers', 'timeout')
         result_attrs = ('status', 'reason', 'msg', 'body', 'headers')
         params['error'] = self.err
+        params['elapsed'] = '{:.3f}s'.format(self.elapsed) if self.elapsed is not None else None
+        params['body'] = self._describe_body(self.request.get('data'), self.request.get('data_size'))
 
         for key in request_keys:
             params[key] = self.request.get(key)
         for attr in result_attrs:
             params['result_{}'.format(attr)] = getattr(self.result, attr, '')
+        params['result_body'] = self._describe_body(self.result.body, getattr(self.result, 'body_size', 0))
 
         params = self._dict_vals_to_unicode(params)
         return self.as_str_template.format(**params)
 
+    def _describe_body(self, body, size):
+        if body is None:
+            return None
+        body = self._to_unicode(body)
+        if size and size > len(body):
+            body += '... ({} of {} shown)'.format(len(body), size)
+        return body
+
+    def _to_unicode(self, val):
+        if isinstance(val, (bytes, bytearray)):
+            return bytes(val).decode('utf-8', 'replace')
+        return val if isinstance(val, str) else str(val)
+
     def _dict_vals_to_unicode(self, data):
-        unicode_data = {}
-        for key, val in data.items():
-            if not isinstance(val, str):
-                unicode_data[key] = str(val, 'utf-8')
-            else:
-                unicode_data[key] = val
-        return unicode_data
+        return {key: self._to_unicode(val) for key, val in data.items()}
 
 
 class BambooBadRequest(BambooError):
@@ -94,3 +202,7 @@ class BambooLimitExceeded(BambooError):
 
 class BambooServerError(BambooError):
     """Error wrapper for most 500 errors"""
+
+
+class BambooCircuitOpen(BambooError):
+    """Error wrapper for requests rejected by an open circuit breaker"""
@@ -0,0 +1,79 @@
+import threading
+
+
+class HedgePolicy(object):
+    """
+    Opt-in policy for hedging idempotent GET requests: when the first attempt has not
+    answered after the learned `percentile` latency of the endpoint, a second identical
+    request is sent and the first successful response wins.
+
+    The budget caps the extra load: every request earns `budget` hedge tokens (so 0.05
+    allows hedging at most 5% of the requests) and every hedge spends one.
+    """
+
+    def __init__(self, percentile=95, min_samples=20, min_delay=0.05, max_delay=None, default_delay=None,
+                 budget=0.05, max_tokens=10):
+        """
+        :param percentile: latency percentile, per endpoint, after which the hedge is sent
+        :type percentile: float
+        :param min_samples: number of samples needed before trusting the learned percentile
+        :type min_samples: int
+        :param min_delay: lower bound, in seconds, of the hedge delay
+        :type min_delay: float
+        :param max_delay: upper bound, in seconds, of the hedge delay
+        :type max_delay: float
+        :param default_delay: delay used while there are not enough samples, None disables hedging meanwhile
+        :type default_delay: float
+        :param budget: hedge tokens earned per request
+        :type budget: float
+        :param max_tokens: maximum number of tokens that can be saved up
+        :type max_tokens: float
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.budget = budget
+        self.max_tokens = max_tokens
+        self.requests = 0
+        self.hedges = 0
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self, latencies, endpoint, timeout=None):
+        """
+        :param latencies: the tracker with the recent latencies of the client
+        :type latencies: bamboopy.latency.LatencyTracker
+        :param endpoint: the endpoint key
+        :param timeout: the request timeout, a hedge is pointless after it
+        :return: seconds to wait before hedging, or None to not hedge at all
+        """
+        if latencies.count(endpoint) >= self.min_samples:
+            delay = latencies.percentile(endpoint, self.percentile)
+        else:
+            delay = self.default_delay
+
+        if delay is None:
+            return
+        delay = max(delay, self.min_delay)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        if timeout is not None and delay >= timeout:
+            return
+
+        return delay
+
+    def track_request(self):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self._tokens + self.budget, self.max_tokens)
+
+    def acquire(self):
+        """Spend a hedge token, returns False when the budget is exhausted"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
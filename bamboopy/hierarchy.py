@@ -0,0 +1,290 @@
+import bisect
+import itertools
+import threading
+
+from bamboopy.cache import employee_key
+from bamboopy.query import field_value
+
+# Distance between consecutive interval labels of a full build, leaving room for updates
+spacing = 1 << 32
+
+
+class Hierarchy(object):
+    """
+    Reporting-line index built from the supervisor id field of a snapshot of employees.
+
+    Every employee gets a pre-order interval (enter, exit) so that descendants are a slice of
+    the traversal order and ancestry checks are two comparisons. Intervals are numbered with
+    gaps, so a new hire is given labels inside its supervisor's interval and a supervisor
+    change relabels only the subtree that moves, in O(subtree size). The whole index is
+    rebuilt lazily, in O(n), only when an update cannot be applied in place: a manager added
+    after the employees reporting to it, a reporting cycle, or a gap used up.
+    """
+
+    def __init__(self, employees=None, supervisor_field='supervisorEId'):
+        """
+        :param employees: the employees, e.g. from a custom report including the supervisor field
+        :type employees: list
+        :param supervisor_field: the field holding the id of the supervisor
+        :type supervisor_field: str
+        """
+        self.supervisor_field = supervisor_field
+        self._employees = {}
+        self._parent = {}
+        self._children = {}
+        self._enter = {}
+        self._exit = {}
+        self._depth = {}
+        self._order = []
+        self._labels = []
+        self._bounds = []
+        self._dirty = True
+        self._cyclic = False
+        self._lock = threading.RLock()
+        for employee in employees or []:
+            self._set(employee)
+
+    @classmethod
+    def from_resource(cls, resource, supervisor_field='supervisorEId'):
+        """
+        :param resource: a Directory or Report
+        :return: the hierarchy of its employees
+        """
+        return cls(resource.employees, supervisor_field)
+
+    def __len__(self):
+        return len(self._employees)
+
+    def __contains__(self, employee_id):
+        return employee_key(employee_id) in self._employees
+
+    def _supervisor_of(self, employee):
+        value = field_value(employee, self.supervisor_field)
+        if value in (None, ''):
+            return
+        try:
+            return employee_key(value)
+        except (TypeError, ValueError):
+            return
+
+    def _set(self, employee):
+        key = employee_key(employee.id)
+        parent = self._supervisor_of(employee)
+        self._employees[key] = employee
+        self._children.setdefault(key, {})
+        if key in self._parent and self._parent[key] == parent:
+            return
+
+        self._detach(key)
+        self._parent[key] = parent
+        if parent is not None:
+            self._children.setdefault(parent, {})[key] = True
+        self._relabel(key)
+
+    def _detach(self, key):
+        previous = self._parent.pop(key, None)
+        if previous is not None and previous in self._children:
+            self._children[previous].pop(key, None)
+
+    def update(self, employee):
+        """Adds an employee or applies its changes, e.g. a new supervisor"""
+        with self._lock:
+            self._set(employee)
+
+    def remove(self, employee_id):
+        """Removes an employee, its direct reports become roots until they are updated"""
+        key = employee_key(employee_id)
+        with self._lock:
+            if key not in self._employees:
+                return
+            self._detach(key)
+            del self._employees[key]
+            reports = [k for k in self._children.get(key, ()) if k in self._employees]
+            if not self._children.get(key):
+                self._children.pop(key, None)
+            if self._dirty or self._cyclic:
+                self._dirty = True
+                return
+
+            self._cut(key)
+            for report in reports:
+                self._place(report, 0)
+
+    def _roots(self):
+        return [k for k in self._employees if self._parent.get(k) not in self._employees]
+
+    def _layout(self, root, depth, labels):
+        """
+        Gives the subtree of root pre-order intervals taken from the labels iterator
+        :return: the keys laid out, in pre-order
+        """
+        placed = []
+        stack = [(root, depth, False)]
+        while stack:
+            key, level, leaving = stack.pop()
+            if leaving:
+                self._exit[key] = next(labels)
+                continue
+            if key in self._enter:
+                continue  # reporting cycle
+            self._enter[key] = next(labels)
+            self._depth[key] = level
+            placed.append(key)
+            stack.append((key, level, True))
+            children = [k for k in self._children.get(key, ()) if k in self._employees]
+            stack.extend((k, level + 1, False) for k in reversed(children))
+        return placed
+
+    def _build(self):
+        if not self._dirty:
+            return
+
+        self._enter, self._exit, self._depth = {}, {}, {}
+        labels = itertools.count(spacing, spacing)
+        order = []
+        for root in self._roots():
+            order.extend(self._layout(root, 0, labels))
+        # employees in a reporting cycle are not reachable from any root
+        self._cyclic = len(order) < len(self._employees)
+        for key in self._employees:
+            if key not in self._enter:
+                order.extend(self._layout(key, 0, labels))
+
+        self._order = order
+        self._labels = [self._enter[k] for k in order]
+        self._bounds = sorted(itertools.chain(self._enter.values(), self._exit.values()))
+        self._dirty = False
+
+    def _relabel(self, key):
+        """Moves the subtree of key under its current supervisor, or marks the index for a rebuild"""
+        if self._dirty or self._cyclic:
+            self._dirty = True
+            return
+
+        parent = self._parent.get(key)
+        if key in self._enter:
+            if parent in self._enter and self._enter[key] <= self._enter[parent] <= self._exit[key]:
+                self._dirty = True  # the employee would report to one of its reports
+                return
+            size = len(self._cut(key))
+        elif any(k in self._employees for k in self._children[key]):
+            self._dirty = True  # employees already reporting to the new one would have to move
+            return
+        else:
+            size = 1
+
+        if not self._place(key, size):
+            self._dirty = True
+
+    def _cut(self, key):
+        """Drops the intervals of the subtree of key, returns its keys"""
+        enter, exit = self._enter[key], self._exit[key]
+        start, end = bisect.bisect_left(self._labels, enter), bisect.bisect_right(self._labels, exit)
+        keys = self._order[start:end]
+        del self._labels[start:end]
+        del self._order[start:end]
+        del self._bounds[bisect.bisect_left(self._bounds, enter):bisect.bisect_right(self._bounds, exit)]
+        for k in keys:
+            del self._enter[k], self._exit[k], self._depth[k]
+        return keys
+
+    def _place(self, key, size):
+        """
+        Lays out the subtree of key, of `size` employees, after the last interval inside its
+        supervisor's one, or after every interval when it is a root
+        :return: False when the gap left in the supervisor's interval is too small
+        """
+        parent = self._parent.get(key)
+        step = spacing
+        if parent in self._enter:
+            high = self._exit[parent]
+            low = self._bounds[bisect.bisect_left(self._bounds, high) - 1]
+            step = min(step, (high - low) // (2 * size + 1))
+            if step < 1:
+                return False
+            depth = self._depth[parent] + 1
+        else:
+            low = self._bounds[-1] if self._bounds else 0
+            depth = 0
+
+        placed = self._layout(key, depth, itertools.count(low + step, step))
+        start = bisect.bisect_left(self._labels, self._enter[key])
+        self._labels[start:start] = [self._enter[k] for k in placed]
+        self._order[start:start] = placed
+        bounds = sorted(itertools.chain((self._enter[k] for k in placed), (self._exit[k] for k in placed)))
+        start = bisect.bisect_left(self._bounds, bounds[0])
+        self._bounds[start:start] = bounds
+        return True
+
+    def employee(self, employee_id):
+        return self._employees.get(employee_key(employee_id))
+
+    def supervisor(self, employee_id):
+        with self._lock:
+            return self._employees.get(self._parent.get(employee_key(employee_id)))
+
+    def direct_reports(self, employee_id):
+        with self._lock:
+            children = self._children.get(employee_key(employee_id), ())
+            return [self._employees[k] for k in children if k in self._employees]
+
+    def _descendant_slice(self, key):
+        return bisect.bisect_right(self._labels, self._enter[key]), bisect.bisect_left(self._labels, self._exit[key])
+
+    def descendants(self, employee_id):
+        """All the employees reporting, directly or not, to the given one"""
+        key = employee_key(employee_id)
+        with self._lock:
+            self._build()
+            if key not in self._enter:
+                return []
+            start, end = self._descendant_slice(key)
+            return [self._employees[k] for k in self._order[start:end]]
+
+    def management_chain(self, employee_id):
+        """The supervisors of an employee, from its direct supervisor up to the top"""
+        key = employee_key(employee_id)
+        chain = []
+        seen = {key}
+        with self._lock:
+            parent = self._parent.get(key)
+            while parent in self._employees and parent not in seen:
+                chain.append(self._employees[parent])
+                seen.add(parent)
+                parent = self._parent.get(parent)
+        return chain
+
+    def span_of_control(self, employee_id, recursive=False):
+        """
+        :param employee_id: the employee id
+        :param recursive: count every descendant instead of only the direct reports
+        :return: the number of employees
+        """
+        key = employee_key(employee_id)
+        with self._lock:
+            if not recursive:
+                return len([k for k in self._children.get(key, ()) if k in self._employees])
+            self._build()
+            if key not in self._enter:
+                return 0
+            start, end = self._descendant_slice(key)
+            return end - start
+
+    def depth(self, employee_id):
+        """Number of supervisors above the employee, 0 for the top of the organization"""
+        with self._lock:
+            self._build()
+            return self._depth.get(employee_key(employee_id))
+
+    def is_under(self, employee_id, manager_id):
+        """Whether the employee reports, directly or not, to the manager"""
+        key, manager = employee_key(employee_id), employee_key(manager_id)
+        with self._lock:
+            self._build()
+            if key not in self._enter or manager not in self._enter or key == manager:
+                return False
+            return self._enter[manager] < self._enter[key] < self._exit[manager]
+
+    def roots(self):
+        with self._lock:
+            return [self._employees[k] for k in self._roots()]
@@ -0,0 +1,55 @@
+import re
+import threading
+from collections import deque
+
+id_segment = re.compile(r'^\d+$')
+
+
+def endpoint_key(method, subpath):
+    """
+    Build a stable key for an API endpoint, replacing numeric path segments
+    (employee ids, file ids...) so that every employee shares the same stats.
+    :param method: the http method
+    :type method: str
+    :param subpath: the path relative to the api version
+    :type subpath: str
+    :return: a key such as "GET employees/{id}/files/view"
+    """
+    segments = [s for s in subpath.split('?')[0].split('/') if s]
+    segments = ['{id}' if id_segment.match(s) else s for s in segments]
+    return '{} {}'.format(method, '/'.join(segments))
+
+
+class LatencyTracker(object):
+    """Keeps a sliding window of recent response times per endpoint"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(elapsed)
+
+    def count(self, endpoint):
+        with self._lock:
+            return len(self._samples.get(endpoint, ()))
+
+    def percentile(self, endpoint, percentile, default=None):
+        """
+        :param endpoint: the endpoint key
+        :param percentile: a value between 0 and 100
+        :param default: returned when there are no samples for the endpoint
+        :return: the latency, in seconds, below which `percentile` percent of the samples fall
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if not samples:
+            return default
+
+        index = int(round((len(samples) - 1) * percentile / 100.0))
+        return samples[min(max(index, 0), len(samples) - 1)]
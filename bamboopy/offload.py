@@ -0,0 +1,76 @@
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from bamboopy.base import digest_result
+
+
+def digest_and_hydrate(data, status, content_type=None, resource=None):
+    """Runs in the worker process, both arguments and result must be picklable"""
+    result = digest_result(data, status, content_type)
+    if not resource:
+        return result
+    if not result:
+        return
+
+    return resource(result)
+
+
+class ParsePool(object):
+    """
+    Offloads parsing of large response bodies, and building the resources out of them,
+    to a process pool so that it neither holds the GIL nor stalls the other request threads.
+    Pass it to the client as the `parse_pool` option.
+    """
+
+    def __init__(self, threshold=512 * 1024, max_workers=None, executor=None, mp_context=None):
+        """
+        :param threshold: body size, in bytes, from which parsing is offloaded
+        :type threshold: int
+        :param max_workers: number of worker processes
+        :type max_workers: int
+        :param executor: an already created executor to use instead of a new ProcessPoolExecutor
+        :type executor: concurrent.futures.Executor
+        :param mp_context: how the workers are started, forkserver (or spawn where it is not
+            available) by default as forking a process running other threads is unsafe
+        """
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self._executor = executor
+        self._lock = threading.Lock()
+
+    def _context(self):
+        if self.mp_context is not None:
+            return self.mp_context
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context())
+            return self._executor
+
+    def offloads(self, body):
+        return isinstance(body, (bytes, str)) and len(body) >= self.threshold
+
+    def submit(self, data, status, content_type=None, resource=None):
+        """
+        :param data: the raw response body
+        :param status: the response status
+        :param content_type: the response content type
+        :param resource: a picklable callable (resource class or functools.partial) applied to the parsed result
+        :return: a future with the parsed (and hydrated) result
+        """
+        return self.executor.submit(digest_and_hydrate, data, status, content_type, resource)
+
+    def digest(self, data, status, content_type=None, resource=None):
+        return self.submit(data, status, content_type, resource).result()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,152 @@
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from bamboopy import BambooNotFound
+from bamboopy.cache import employee_key
+from bamboopy.query import field_value
+from bamboopy.snapshot import iso_timestamp
+
+EMPLOYEE = 'employee'
+DIRECTORY = 'directory'
+REPORT = 'report'
+CACHE = 'cache'
+
+
+class FetchPlan(object):
+    """The endpoint chosen to read some fields of some employees, and its estimated cost"""
+
+    def __init__(self, strategy, ids, fields, cost, last_changed=None):
+        self.strategy = strategy
+        self.ids = ids
+        self.fields = fields
+        self.cost = cost
+        self.last_changed = last_changed
+
+    def __repr__(self):
+        return '<FetchPlan {} cost={} ids={} fields={}>'.format(
+            self.strategy, self.cost, 'all' if self.ids is None else len(self.ids), self.fields)
+
+
+class FetchPlanner(object):
+    """
+    Reads fields of employees through the cheapest endpoint: one get_employee call per
+    employee for a few ids, the directory when it holds every requested field, a custom report
+    otherwise, or the cache refreshed with a report of the employees changed since it was loaded
+    (or since its snapshot was taken) and cleared of the ones deleted since then.
+    """
+
+    def __init__(self, client, cache=None, directory_fields=None, report_cost=3, directory_cost=2, max_workers=4):
+        """
+        :param client: the client used to fetch
+        :type client: bamboopy.BambooHR
+        :param cache: an EmployeeCache, used when it holds every requested field
+        :type cache: bamboopy.cache.EmployeeCache
+        :param directory_fields: field ids returned by the directory, taken from the cache when it is loaded
+        :type directory_fields: list
+        :param report_cost: cost of a custom report in get_employee calls, it returns every employee
+        :type report_cost: float
+        :param directory_cost: cost of the directory in get_employee calls
+        :type directory_cost: float
+        :param max_workers: get_employee calls made in parallel
+        :type max_workers: int
+        """
+        self.client = client
+        self.cache = cache
+        self.directory_fields = directory_fields
+        self.report_cost = report_cost
+        self.directory_cost = directory_cost
+        self.max_workers = max_workers
+
+    def _directory_fields(self):
+        if self.cache is not None and self.cache.directory is not None:
+            return set(field.id for field in self.cache.directory.fields)
+        if self.directory_fields is not None:
+            return set(self.directory_fields)
+
+    def _cached_fields(self):
+        if self.cache is None or self.cache.timestamp is None or self.cache.directory is None:
+            return
+        return set(['id'] + [field.id for field in self.cache.directory.fields])
+
+    def plan(self, ids, fields):
+        """
+        :param ids: employee ids, None for every employee
+        :type ids: list
+        :param fields: field ids or aliases
+        :type fields: list
+        :return: a FetchPlan
+        """
+        ids = None if ids is None else [employee_key(x) for x in ids]
+        fields = list(fields)
+        wanted = set(fields) - {'id'}
+
+        cached_fields = self._cached_fields()
+        if cached_fields is not None and wanted <= cached_fields:
+            return FetchPlan(CACHE, ids, fields, 1, iso_timestamp(self.cache.timestamp))
+
+        options = [(self.report_cost, REPORT)]
+        directory_fields = self._directory_fields()
+        if directory_fields is not None and wanted <= directory_fields:
+            options.append((self.directory_cost, DIRECTORY))
+        if ids is not None:
+            options.append((len(ids), EMPLOYEE))
+
+        cost, strategy = min(options, key=lambda x: x[0])
+        return FetchPlan(strategy, ids, fields, cost)
+
+    def fetch(self, ids, fields):
+        """
+        :param ids: employee ids, None for every employee
+        :param fields: field ids or aliases
+        :return: a dict of employee id => dict of field => value, ids not found are left out
+        """
+        plan = self.plan(ids, fields)
+        return self.execute(plan)
+
+    def execute(self, plan):
+        employees = getattr(self, '_fetch_{}'.format(plan.strategy))(plan)
+        wanted = None if plan.ids is None else set(plan.ids)
+
+        result = {}
+        for employee in employees:
+            key = employee_key(employee.id)
+            if wanted is None or key in wanted:
+                result[key] = {field: key if field == 'id' else field_value(employee, field) for field in plan.fields}
+        return result
+
+    def _fetch_employee(self, plan):
+        # Typed like the values of the directory and reports, whatever the endpoint picked
+        schema = self.client.get_field_types()
+
+        def get(employee_id):
+            try:
+                return self.client.get_employee(employee_id, [x for x in plan.fields if x != 'id'], schema=schema)
+            except BambooNotFound:
+                return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [x for x in executor.map(get, plan.ids) if x]
+
+    def _fetch_directory(self, plan):
+        directory = self.client.get_directory()
+        if self.cache is not None and directory:
+            self.cache.load(directory)
+        return directory.employees if directory else []
+
+    def _fetch_report(self, plan):
+        report = self.client.get_custom_report('json', [x for x in plan.fields if x != 'id'])
+        return report.employees if report else []
+
+    def _fetch_cache(self, plan):
+        started = datetime.now(timezone.utc)
+        fields = [field.id for field in self.cache.directory.fields]
+        changes = self.client.get_custom_report('json', fields, last_changed=plan.last_changed)
+        for employee in changes.employees if changes else []:
+            self.cache.put(employee)
+        # Deleted employees are not in the report
+        self.cache.invalidate(list(self.client.get_changed_employees(plan.last_changed, 'deleted')))
+        self.cache.timestamp = started
+
+        if plan.ids is None:
+            return self.cache.employees()
+        return [x for x in (self.cache.get(employee_id) for employee_id in plan.ids) if x]
@@ -0,0 +1,70 @@
+import time
+import threading
+
+
+class ConnectionPool(object):
+    """
+    Keeps idle keep-alive connections per protocol and host so that they can be reused by
+    later requests, from the same client or from any other client sharing the pool.
+    Pass it to the client as the `connection_pool` option.
+    """
+
+    def __init__(self, max_idle=10, max_idle_time=30):
+        """
+        :param max_idle: idle connections kept per host
+        :type max_idle: int
+        :param max_idle_time: seconds after which an idle connection is not reused
+        :type max_idle_time: float
+        """
+        self.max_idle = max_idle
+        self.max_idle_time = max_idle_time
+        self.created = 0
+        self.reused = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, connection_type, host, timeout=None, fresh=False):
+        """
+        :param fresh: open a new connection instead of reusing an idle one, e.g. after an idle
+            connection turned out to be closed by the server
+        :type fresh: bool
+        :return: a connection, with `reused` telling whether it had sent requests already
+        """
+        key = (connection_type, host)
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and not fresh:
+                connection, released = idle.pop()
+                if now - released > self.max_idle_time:
+                    connection.close()
+                    continue
+                self.reused += 1
+                connection.reused = True
+                connection.timeout = timeout
+                if getattr(connection, 'sock', None) is not None:
+                    connection.sock.settimeout(timeout)
+                return connection
+            self.created += 1
+
+        connection = connection_type(host, timeout=timeout)
+        connection.pool_key = key
+        connection.pool = self
+        connection.reused = False
+        return connection
+
+    def release(self, connection):
+        key = getattr(connection, 'pool_key', (connection.__class__, connection.host))
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
@@ -0,0 +1,156 @@
+import bisect
+import threading
+
+
+def field_value(employee, field):
+    """Value of a field of an employee, looked up in its fields and then in the raw data"""
+    if field == 'id':
+        return employee.id
+    if field in employee.fields:
+        return employee.fields[field]
+    return employee._raw.get(field) if isinstance(employee._raw, dict) else None
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(x) for x in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+class Queryable(object):
+    """
+    Query methods for resources holding a list of employees (Directory, Report). Hash and
+    sorted indexes are built lazily per field and reused until the employees are replaced,
+    or employees are added or removed. Call invalidate_indexes() after editing the fields of
+    an employee in place, otherwise the stale indexes keep being served.
+    """
+
+    def _index_cache(self):
+        state = self.__dict__.get('_indexes')
+        employees = self.employees
+        # Holding the list itself, ids of freed lists are reused by new ones
+        if state is None or state['employees'] is not employees or state['length'] != len(employees):
+            state = self.__dict__['_indexes'] = {'employees': employees, 'length': len(employees),
+                                                 'hash': {}, 'sorted': {}, 'lock': threading.Lock()}
+        return state
+
+    def __getstate__(self):
+        state = dict(super(Queryable, self).__getstate__())
+        state.pop('_indexes', None)
+        return state
+
+    def close(self):
+        """Releases the employees, e.g. the memory map of a snapshot loaded lazily"""
+        close = getattr(self.employees, 'close', None)
+        if close:
+            close()
+
+    def invalidate_indexes(self):
+        """Drops the indexes, needed after editing employees in place"""
+        self.__dict__.pop('_indexes', None)
+
+    def index(self, field):
+        """
+        :param field: the field id
+        :return: a dict of value => list of employees with that value
+        """
+        cache = self._index_cache()
+        with cache['lock']:
+            index = cache['hash'].get(field)
+            if index is None:
+                index = {}
+                for employee in self.employees:
+                    index.setdefault(_hashable(field_value(employee, field)), []).append(employee)
+                cache['hash'][field] = index
+        return index
+
+    def sorted_index(self, field):
+        """
+        :param field: the field id
+        :return: a tuple (sorted values, employees in the same order), employees without value are left out
+        """
+        cache = self._index_cache()
+        with cache['lock']:
+            index = cache['sorted'].get(field)
+            if index is None:
+                pairs = [(field_value(x, field), n, x) for n, x in enumerate(self.employees)]
+                try:
+                    pairs = sorted(p for p in pairs if p[0] is not None)
+                except TypeError:
+                    raise ValueError("Field {} has values that cannot be ordered".format(field))
+                index = cache['sorted'][field] = ([p[0] for p in pairs], [p[2] for p in pairs])
+        return index
+
+    def _matches(self, field, value):
+        index = self.index(field)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            employees = []
+            for x in value:
+                employees.extend(index.get(_hashable(x), ()))
+            return employees
+        return index.get(_hashable(value), [])
+
+    def filter(self, **criteria):
+        """
+        Employees matching every criteria, e.g. filter(department='Sales', location=['Madrid', 'Lisbon'])
+        :param criteria: field id => value, or collection of accepted values
+        :return: a list of employees
+        """
+        if not criteria:
+            return list(self.employees)
+
+        candidates = sorted((self._matches(f, v) for f, v in criteria.items()), key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            ids = set(map(id, other))
+            result = [x for x in result if id(x) in ids]
+        return list(result)
+
+    def between(self, field, low=None, high=None, inclusive=True):
+        """
+        Employees whose field value is in a range, e.g. between('hireDate', date(2018, 1, 1), date(2018, 12, 31))
+        :param field: the field id
+        :param low: lower bound, None for unbounded, of the type of the values (a date for date fields)
+        :param high: upper bound, None for unbounded
+        :param inclusive: whether the bounds are included
+        :return: a list of employees sorted by the field value
+        """
+        values, employees = self.sorted_index(field)
+        start, end = 0, len(values)
+        try:
+            if low is not None:
+                start = (bisect.bisect_left if inclusive else bisect.bisect_right)(values, low)
+            if high is not None:
+                end = (bisect.bisect_right if inclusive else bisect.bisect_left)(values, high)
+        except TypeError:
+            raise ValueError("Bounds {!r} and {!r} cannot be compared with the values of field {}".format(low, high, field))
+        return employees[start:end]
+
+    def group_by(self, field, **criteria):
+        """
+        :param field: the field id to group by
+        :param criteria: optional filter applied before grouping
+        :return: a dict of value => list of employees
+        """
+        if not criteria:
+            return {k: list(v) for k, v in self.index(field).items()}
+
+        groups = {}
+        for employee in self.filter(**criteria):
+            groups.setdefault(_hashable(field_value(employee, field)), []).append(employee)
+        return groups
+
+    def count(self, **criteria):
+        if not criteria:
+            return len(self.employees)
+        return len(self.filter(**criteria))
+
+    def count_by(self, field, **criteria):
+        """
+        :return: a dict of value => number of employees
+        """
+        if not criteria:
+            return {k: len(v) for k, v in self.index(field).items()}
+        return {k: len(v) for k, v in self.group_by(field, **criteria).items()}
@@ -0,0 +1,53 @@
+import time
+import threading
+
+
+class RateLimiter(object):
+    """Token bucket allowing `rate` operations per second with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: operations per second
+        :type rate: float
+        :param burst: bucket size, defaults to one second worth of operations
+        :type burst: float
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        :return: 0 when the tokens were taken, otherwise the seconds to wait until they are available
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def wait_time(self, tokens=1):
+        """
+        :return: the seconds to wait until the tokens are available, without taking them
+        """
+        with self._lock:
+            self._refill()
+            return max(tokens - self._tokens, 0) / self.rate
+
+    def acquire(self, tokens=1):
+        """Blocks until the tokens are available, returns the seconds waited"""
+        waited = 0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
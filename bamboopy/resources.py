@@ -1,11 +1,12 @@
 import functools
 from datetime import datetime
 
-prop_type_map =  {
-    'text': str,
-    'integer': int,
-    'list': str,  # not sure why documentation says list
-}
+from bamboopy.query import Queryable
+from bamboopy import converters
+from bamboopy.converters import compile_converter
+
+# Moved to bamboopy.converters, kept importable from here for compatibility
+prop_type_map = converters.prop_type_map
 
 
 class Resource(object):
@@ -26,6 +27,13 @@ class Resource(object):
             else:
                 raise AttributeError('{} object has no attribute {} ({})'.format(self.__class__, item, exception))
 
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        # Defined so that unpickling does not go through __getattr__ before _raw exists
+        self.__dict__.update(state)
+
     def __eq__(self, other):
         """Comparision method."""
         return self.id == other.id
@@ -41,30 +49,32 @@ class Resource(object):
         return type(value) if type else value
 
 
-class Directory(Resource):
+class Directory(Queryable, Resource):
     """Directory entity resource"""
     def __init__(self, *args, **kwargs):
         super(Directory, self).__init__(*args, **kwargs)
 
         self.fields = [Field(x) for x in self._get('fields')]
-        self.employees = [Employee(x, self.fields) for x in self._get('employees')]
+        self._converter = compile_converter(self.fields)
+        self.employees = [self.build_employee(x) for x in self._get('employees')]
+
+    def build_employee(self, raw):
+        return Employee(raw, self.fields, converter=self._converter)
 
 
 class Employee(Resource):
     """Employee entity resource"""
-    def __init__(self, raw, fields=None, **kwargs):
+    def __init__(self, raw, fields=None, converter=None, schema=None, **kwargs):
+        """
+        :param raw: the employee as returned by the API
+        :param fields: Field objects or field ids/aliases
+        :param converter: a converter already compiled for `fields`, see compile_converter
+        :param schema: field id/alias => type, to type the fields given as ids
+        """
         super(Employee, self).__init__(raw, **kwargs)
 
         self.id = self._get('id', type=float)
-        self.fields = {}
-
-        for field in fields:
-            if isinstance(field, str):
-                self.fields[field] = self._get(field, None)
-            elif isinstance(field, int):
-                self.fields[str(field)] = self._get(str(field), None)
-            else:
-                self.fields[field.id] = prop_type_map.get(field.type, str)(self._get(field.id))
+        self.fields = (converter or compile_converter(fields, schema))(self._raw)
 
         if self._get('category'):
             self.categories = [File(x) for x in self._get('category')]
@@ -80,6 +90,7 @@ class Field(Resource):
         self.id = self._get('id')
         self.type = self._get('type')
         self.name = self._get('name')
+        self.alias = self._get('alias')
 
 
 class File(Resource):
@@ -110,7 +121,7 @@ class FilesCategory(Resource):
                 self.files = [File(self._get('file'))]
 
 
-class Report(Resource):
+class Report(Queryable, Resource):
     """Report entity resource"""
     def __init__(self, *args, **kwargs):
         super(Report, self).__init__(*args, **kwargs)
@@ -122,9 +133,12 @@ class Report(Resource):
         if self._get('fields'):
             self.fields = [Field(x) for x in self._get('fields')]
 
+        self._converter = compile_converter(self.fields)
         if self._get('employees'):
-            fieldlist = list(map(lambda x: x.id, self.fields))
-            self.employees = [Employee(x, fieldlist) for x in self._get('employees')]
+            self.employees = [self.build_employee(x) for x in self._get('employees')]
+
+    def build_employee(self, raw):
+        return Employee(raw, self.fields, converter=self._converter)
 
 
 class User(Resource):
@@ -151,3 +165,14 @@ class TabularField(Resource):
 
         if self._get('fields'):
             self.fields = [Field(x) for x in self._get('fields')]
+
+
+class EmployeeChange(Resource):
+    """Employee change notification sent by a webhook"""
+    def __init__(self, *args, **kwargs):
+        super(EmployeeChange, self).__init__(*args, **kwargs)
+        self.id = self._get('id')
+        self.action = self._get('action')
+        self.changed_fields = self._get('changedFields') or []
+        self.fields = self._get('fields') or {}
+        self.timestamp = self._get('timestamp')
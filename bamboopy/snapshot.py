@@ -0,0 +1,143 @@
+import os
+import json
+import mmap
+import struct
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+from bamboopy.resources import Directory, Report
+
+MAGIC = b'BMBS'
+VERSION = 1
+# magic, version, kind, timestamp, number of rows, metadata length
+HEADER = struct.Struct('<4sHHdQQ')
+OFFSET = struct.Struct('<Q')
+
+kinds = {
+    0: Directory,
+    1: Report,
+}
+
+
+def _kind_of(resource):
+    for kind, cls in kinds.items():
+        if isinstance(resource, cls):
+            return kind
+    raise ValueError("Cannot snapshot {}".format(resource.__class__))
+
+
+def iso_timestamp(timestamp):
+    """Formats a timestamp the way the lastChanged filter of custom reports expects it"""
+    return timestamp.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def save_snapshot(resource, path, timestamp=None):
+    """
+    Writes the employees of a Directory or Report to a versioned binary file.
+
+    Layout: header, metadata (json), row offsets (uint64) and the rows, every row being the
+    json array of its raw values in the order of the metadata columns.
+    :param resource: the Directory or Report
+    :param path: the destination file
+    :type path: str
+    :param timestamp: when the data was fetched, defaults to the snapshot timestamp of the resource or now
+    :type timestamp: datetime
+    :return: the timestamp stored
+    """
+    kind = _kind_of(resource)
+    timestamp = timestamp or getattr(resource, 'snapshot_timestamp', None) or datetime.now(timezone.utc)
+    rows = [employee._raw for employee in resource.employees]
+
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, len(columns))
+
+    meta = {key: value for key, value in resource._raw.items() if key != 'employees'}
+    meta = json.dumps({'columns': list(columns), 'raw': meta}, separators=(',', ':')).encode('utf-8')
+
+    offsets = [0]
+    encoded = []
+    for row in rows:
+        data = json.dumps([row.get(key) for key in columns], separators=(',', ':'), default=str).encode('utf-8')
+        encoded.append(data)
+        offsets.append(offsets[-1] + len(data))
+
+    tmp = '{}.tmp'.format(path)
+    with open(tmp, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, kind, timestamp.timestamp(), len(rows), len(meta)))
+        file.write(meta)
+        file.write(b''.join(OFFSET.pack(x) for x in offsets))
+        for data in encoded:
+            file.write(data)
+    os.replace(tmp, path)
+    return timestamp
+
+
+class LazyEmployees(Sequence):
+    """Employees of a memory-mapped snapshot, each row is decoded the first time it is accessed"""
+
+    def __init__(self, resource, buffer, columns, count, offsets_start):
+        self.resource = resource
+        self.columns = columns
+        self._buffer = buffer
+        self._count = count
+        self._offsets_start = offsets_start
+        self._data_start = offsets_start + (count + 1) * OFFSET.size
+        self._employees = [None] * count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        employee = self._employees[index]
+        if employee is None:
+            if index < 0:
+                index += self._count
+            # Unpacked with the little-endian OFFSET format they were written with
+            start, end = (self._data_start + OFFSET.unpack_from(self._buffer, self._offsets_start + i * OFFSET.size)[0]
+                          for i in (index, index + 1))
+            values = json.loads(bytes(self._buffer[start:end]).decode('utf-8'))
+            employee = self._employees[index] = self.resource.build_employee(dict(zip(self.columns, values)))
+        return employee
+
+    def __getstate__(self):
+        raise TypeError("Memory-mapped employees cannot be pickled, load the snapshot with lazy=False")
+
+    def close(self):
+        """Unmaps the snapshot, employees not decoded yet can no longer be accessed"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def load_snapshot(path, lazy=True):
+    """
+    :param path: the snapshot file
+    :type path: str
+    :param lazy: memory-map the file and decode employees on access instead of all at once
+    :type lazy: bool
+    :return: the Directory or Report, with its `snapshot_timestamp`. When lazy, call its
+        close() once done to unmap the file
+    """
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if lazy else file.read()
+
+    if len(buffer) < HEADER.size:
+        raise ValueError("{} is not a snapshot".format(path))
+    magic, version, kind, timestamp, count, meta_length = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("{} is not a snapshot".format(path))
+    if version != VERSION or kind not in kinds:
+        raise ValueError("Unsupported snapshot version {} (kind {})".format(version, kind))
+
+    meta = json.loads(bytes(buffer[HEADER.size:HEADER.size + meta_length]).decode('utf-8'))
+    raw = dict(meta['raw'], employees=[])
+    resource = kinds[kind](raw)
+    resource.snapshot_timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+
+    employees = LazyEmployees(resource, buffer, meta['columns'], count, HEADER.size + meta_length)
+    resource.employees = employees if lazy else list(employees)
+    return resource
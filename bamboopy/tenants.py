@@ -0,0 +1,261 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from bamboopy import logging_helper
+from bamboopy.bamboohr import BambooHR
+from bamboopy.pool import ConnectionPool
+from bamboopy.ratelimit import RateLimiter
+
+
+class TenantMetrics(object):
+    """Counters of the requests scheduled for a tenant"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.queue_time = 0.0
+        self.run_time = 0.0
+
+    def as_dict(self, queued=0, in_flight=0):
+        finished = self.completed + self.failed
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'throttled': self.throttled,
+            'queued': queued,
+            'in_flight': in_flight,
+            'avg_queue_time': self.queue_time / finished if finished else 0,
+            'avg_run_time': self.run_time / finished if finished else 0,
+        }
+
+
+class Tenant(object):
+    """A company served by the manager, with its own client, limits and queue"""
+
+    def __init__(self, name, client, rate_limiter=None, max_concurrency=2, weight=1):
+        self.name = name
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.weight = weight
+        self.queue = deque()
+        self.in_flight = 0
+        self.credits = 0
+        self.throttled_request = None
+        self.metrics = TenantMetrics()
+
+
+class ClientManager(object):
+    """
+    Serves many BambooHR companies from one process. Clients share a connection pool, and
+    requests are queued per tenant and dispatched to a shared set of workers in weighted
+    round-robin, honouring each tenant's rate limit and concurrency cap, so that a tenant
+    with a large backlog cannot starve the others.
+    """
+
+    def __init__(self, max_workers=8, connection_pool=None, client_class=BambooHR, **client_options):
+        """
+        :param max_workers: requests running at the same time across all the tenants
+        :type max_workers: int
+        :param connection_pool: the pool shared by the clients, a new one by default
+        :type connection_pool: bamboopy.pool.ConnectionPool
+        :param client_class: the client created for every tenant
+        :param client_options: options for every client (timeout, number_retries...)
+        """
+        self.max_workers = max_workers
+        self.connection_pool = connection_pool or ConnectionPool(max_idle=max_workers)
+        self.client_class = client_class
+        self.client_options = client_options
+        self.log = logging_helper.get_log('bamboopy.tenants')
+        self._tenants = {}
+        self._order = []
+        self._next = 0
+        self._running = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    def add_tenant(self, name, company, api_key, rate=None, burst=None, max_concurrency=2, weight=1, **options):
+        """
+        :param name: the tenant name used to submit requests
+        :type name: str
+        :param company: the BambooHR company subdomain
+        :type company: str
+        :param api_key: the api key of the company
+        :type api_key: str
+        :param rate: http requests per second allowed for the tenant, retries and hedges included,
+            unlimited when None
+        :type rate: float
+        :param burst: requests that can be sent at once when the tenant was idle
+        :type burst: float
+        :param max_concurrency: submitted calls of the tenant running at the same time, a bulk call
+            sends its own requests concurrently within it
+        :type max_concurrency: int
+        :param weight: requests dispatched for the tenant on each round-robin turn
+        :type weight: int
+        :param options: client options overriding the manager ones
+        :return: the client of the tenant
+        """
+        client_options = dict(self.client_options, connection_pool=self.connection_pool)
+        client_options.update(options)
+        if rate:
+            # Taken by the client for every http request, the manager only checks it is not empty
+            client_options['rate_limiter'] = RateLimiter(rate, burst)
+        limiter = client_options.get('rate_limiter')
+        client = self.client_class(api_key=api_key, company=company, **client_options)
+
+        with self._condition:
+            if name in self._tenants:
+                raise ValueError("Tenant {} already exists".format(name))
+            self._tenants[name] = Tenant(name, client, limiter, max_concurrency, weight)
+            self._order.append(name)
+        return client
+
+    def remove_tenant(self, name):
+        """Removes a tenant, its queued requests are cancelled"""
+        with self._condition:
+            tenant = self._tenants.pop(name)
+            self._order.remove(name)
+        while tenant.queue:
+            tenant.queue.popleft()[0].cancel()
+
+    def client(self, name):
+        return self._tenants[name].client
+
+    def submit(self, name, method, *args, **kwargs):
+        """
+        Queues a request for a tenant
+        :param name: the tenant name
+        :param method: the name of a client method, or a callable receiving the client
+        :param args: arguments of the method
+        :param kwargs: keyword arguments of the method
+        :return: a Future with the result
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The client manager is shut down")
+            tenant = self._tenants[name]
+            tenant.queue.append((future, method, args, kwargs, time.monotonic()))
+            tenant.metrics.submitted += 1
+            self._condition.notify_all()
+        return future
+
+    def call(self, name, method, *args, **kwargs):
+        """Submits a request and waits for its result"""
+        return self.submit(name, method, *args, **kwargs).result()
+
+    def _eligible(self, tenant):
+        """Returns 0 when the tenant can dispatch now, the seconds to wait if throttled, or None"""
+        if not tenant.queue or tenant.in_flight >= tenant.max_concurrency:
+            return
+        if tenant.rate_limiter:
+            # The tokens are taken by the client, a call is not dispatched to block a worker
+            wait = tenant.rate_limiter.wait_time()
+            if wait:
+                # The dispatcher polls the head of the queue until it can go, count it once
+                if tenant.throttled_request is not tenant.queue[0]:
+                    tenant.throttled_request = tenant.queue[0]
+                    tenant.metrics.throttled += 1
+                return wait
+        return 0
+
+    def _pick(self):
+        """Weighted round-robin over the tenants, returns (tenant, seconds to wait)"""
+        wait = None
+        for _ in range(len(self._order)):
+            tenant = self._tenants[self._order[self._next % len(self._order)]]
+            if tenant.credits <= 0:
+                tenant.credits = tenant.weight
+
+            eligible = self._eligible(tenant)
+            if eligible == 0:
+                tenant.credits -= 1
+                if tenant.credits <= 0:
+                    self._next += 1
+                return tenant, None
+
+            tenant.credits = 0
+            self._next += 1
+            if eligible is not None:
+                wait = eligible if wait is None else min(wait, eligible)
+        return None, wait
+
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed and not any(t.queue for t in self._tenants.values()):
+                        return
+                    tenant, wait = None, None
+                    if self._running < self.max_workers and self._order:
+                        tenant, wait = self._pick()
+                    if tenant:
+                        break
+                    self._condition.wait(wait)
+
+                future, method, args, kwargs, queued = tenant.queue.popleft()
+                tenant.throttled_request = None
+                if not future.set_running_or_notify_cancel():
+                    continue
+                tenant.in_flight += 1
+                tenant.metrics.queue_time += time.monotonic() - queued
+                self._running += 1
+
+            self._executor.submit(self._run, tenant, future, method, args, kwargs)
+
+    def _run(self, tenant, future, method, args, kwargs):
+        started = time.monotonic()
+        try:
+            if callable(method):
+                result = method(tenant.client, *args, **kwargs)
+            else:
+                result = getattr(tenant.client, method)(*args, **kwargs)
+        except BaseException as e:
+            error, result = e, None
+        else:
+            error = None
+
+        with self._condition:
+            tenant.in_flight -= 1
+            self._running -= 1
+            tenant.metrics.run_time += time.monotonic() - started
+            if error is None:
+                tenant.metrics.completed += 1
+            else:
+                tenant.metrics.failed += 1
+            self._condition.notify_all()
+
+        if error is None:
+            future.set_result(result)
+        else:
+            self.log.debug("Request {} of tenant {} failed: {}".format(method, tenant.name, error))
+            future.set_exception(error)
+
+    def metrics(self, name=None):
+        """
+        :param name: a tenant name, all the tenants when None
+        :return: the metrics dict of the tenant, or a dict of tenant name => metrics
+        """
+        with self._condition:
+            if name is not None:
+                tenant = self._tenants[name]
+                return tenant.metrics.as_dict(len(tenant.queue), tenant.in_flight)
+            return {t.name: t.metrics.as_dict(len(t.queue), t.in_flight) for t in self._tenants.values()}
+
+    def shutdown(self, wait=True):
+        """Stops accepting requests, the queued ones are still run"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            self._dispatcher.join()
+        self._executor.shutdown(wait=wait)
+        self.connection_pool.close()
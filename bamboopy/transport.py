@@ -0,0 +1,244 @@
+import json
+import time
+import base64
+import socket
+import random
+import hashlib
+import threading
+from collections import deque
+from http import client
+
+REDACTED = 'REDACTED'
+
+
+def _body_hash(data):
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class BufferedResponse(object):
+    """A response whose body has already been read, exposing what the client uses of HTTPResponse"""
+
+    def __init__(self, status, reason, headers, body, will_close=False):
+        self.status = status
+        self.reason = reason
+        self.msg = reason
+        self.headers = headers
+        self.will_close = will_close
+        self._body = body
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        for key, value in self.headers:
+            if key.lower() == name.lower():
+                return value
+        return default
+
+    def read(self):
+        return self._body
+
+
+class Transport(object):
+    """
+    Creates the connections requests are sent through. A transport is given to the client
+    with the `transport` option and used in place of http.client connections, so it must
+    return objects with the request/getresponse/close interface of HTTPConnection.
+    """
+
+    def connection(self, host, timeout=None):
+        raise Exception("Unimplemented connection for Transport subclass!")
+
+    def __call__(self, host, timeout=None):
+        return self.connection(host, timeout=timeout)
+
+
+class HttpTransport(Transport):
+    """Plain http.client connections"""
+
+    def __init__(self, connection_type=client.HTTPSConnection):
+        self.connection_type = connection_type
+
+    def connection(self, host, timeout=None):
+        return self.connection_type(host, timeout=timeout)
+
+
+class RecordingConnection(object):
+    def __init__(self, transport, connection):
+        self.transport = transport
+        self.connection = connection
+        self.host = connection.host
+        self.timeout = connection.timeout
+        self._request = None
+
+    @property
+    def sock(self):
+        return self.connection.sock
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = (method, url, body, dict(headers or {}), time.monotonic())
+        self.connection.timeout = self.timeout
+        self.connection.request(method, url, body, headers or {})
+
+    def getresponse(self):
+        method, url, body, headers, started = self._request
+        response = self.connection.getresponse()
+        data = response.read()
+        buffered = BufferedResponse(response.status, response.reason, response.getheaders(), data, response.will_close)
+        self.transport.record(self.host, method, url, body, headers, buffered, time.monotonic() - started)
+        return buffered
+
+    def close(self):
+        self.connection.close()
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests through a real transport and appends every request/response pair to a
+    file, one json object per line, with the Authorization header redacted.
+    """
+
+    def __init__(self, path, transport=None, redact=('authorization',)):
+        """
+        :param path: the file the pairs are appended to
+        :type path: str
+        :param transport: the transport requests are really sent through, https by default
+        :type transport: Transport
+        :param redact: header names (lowercase) whose values are not recorded
+        :type redact: tuple
+        """
+        self.path = path
+        self.transport = transport or HttpTransport()
+        self.redact = redact
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def connection(self, host, timeout=None):
+        return RecordingConnection(self, self.transport(host, timeout=timeout))
+
+    def record(self, host, method, url, body, headers, response, elapsed):
+        entry = {
+            'host': host,
+            'method': method,
+            'url': url,
+            'request_headers': {k: REDACTED if k.lower() in self.redact else v for k, v in headers.items()},
+            'body_hash': _body_hash(body),
+            'status': response.status,
+            'reason': response.reason,
+            'headers': [[k, v] for k, v in response.getheaders()],
+            'body': base64.b64encode(response.read() or b'').decode('ascii'),
+            'elapsed': elapsed,
+        }
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+            self.recorded += 1
+
+
+class ReplayConnection(object):
+    def __init__(self, transport, host, timeout=None):
+        self.transport = transport
+        self.host = host
+        self.timeout = timeout
+        self.sock = None
+        self._request = None
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = (method, url, body)
+
+    def getresponse(self):
+        method, url, body = self._request
+        return self.transport.respond(method, url, body, self.timeout)
+
+    def close(self):
+        pass
+
+
+class ReplayTransport(Transport):
+    """
+    Serves recorded responses from a RecordingTransport file without touching the network.
+    Requests are matched by method, url and body; repeated requests cycle through the
+    responses recorded for them. Latency and the number of requests served at the same
+    time can be set to benchmark the client pipeline reproducibly.
+    """
+
+    def __init__(self, path, latency='recorded', jitter=0, speed=1.0, concurrency=None, loop=True, seed=None):
+        """
+        :param path: the file written by RecordingTransport
+        :type path: str
+        :param latency: 'recorded' to replay the recorded latencies, or seconds for every response
+        :param jitter: random extra latency, in seconds, up to this value
+        :type jitter: float
+        :param speed: divides the latency, 2 replays twice as fast
+        :type speed: float
+        :param concurrency: responses served at the same time, unlimited when None
+        :type concurrency: int
+        :param loop: cycle through the responses of a request instead of failing once used up
+        :type loop: bool
+        :param seed: seed of the jitter, for reproducible runs
+        :type seed: int
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.speed = speed
+        self.loop = loop
+        self.served = 0
+        self.missed = 0
+        self._random = random.Random(seed)
+        self._semaphore = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self._lock = threading.Lock()
+        self._responses = {}
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = (entry['method'], entry['url'], entry['body_hash'])
+                    self._responses.setdefault(key, deque()).append(entry)
+
+    def connection(self, host, timeout=None):
+        return ReplayConnection(self, host, timeout)
+
+    def _next(self, method, url, body):
+        key = (method, url, _body_hash(body))
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                self.missed += 1
+                return
+            entry = entries.popleft()
+            if self.loop:
+                entries.append(entry)
+            self.served += 1
+            return entry
+
+    def _delay(self, entry):
+        delay = entry.get('elapsed', 0) if self.latency == 'recorded' else self.latency
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0
+        return (delay + extra) / self.speed
+
+    def respond(self, method, url, body, timeout=None):
+        entry = self._next(method, url, body)
+        if entry is None:
+            return BufferedResponse(501, 'Not Recorded', [('Content-Type', 'text/plain')],
+                                    '{} {} was not recorded'.format(method, url).encode('utf-8'))
+
+        if self._semaphore:
+            self._semaphore.acquire()
+        try:
+            delay = self._delay(entry)
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise socket.timeout('timed out')
+            time.sleep(delay)
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+        headers = [tuple(x) for x in entry['headers']]
+        return BufferedResponse(entry['status'], entry['reason'], headers, base64.b64decode(entry['body']))
@@ -0,0 +1,160 @@
+import hmac
+import json
+import time
+import hashlib
+import threading
+from http import server
+
+from bamboopy import logging_helper
+from bamboopy.cache import employee_key
+from bamboopy.resources import EmployeeChange
+
+SIGNATURE_HEADER = 'X-BambooHR-Signature'
+TIMESTAMP_HEADER = 'X-BambooHR-Timestamp'
+
+
+def sign(secret, body, timestamp):
+    """
+    BambooHR signs webhook payloads with HMAC-SHA256 of the body followed by the timestamp
+    :param secret: the private key of the webhook
+    :type secret: str
+    :param body: the raw request body
+    :type body: bytes
+    :param timestamp: the value of the timestamp header
+    :type timestamp: str
+    :return: the hex digest
+    """
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hmac.new(secret, body + timestamp.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class WebhookHandler(server.BaseHTTPRequestHandler):
+    """Request handler, the receiver is reachable through self.server.receiver"""
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        if self.path.split('?')[0] != receiver.path:
+            return self._respond(404)
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            return self._respond(400)
+        if length < 0:
+            return self._respond(400)
+        body = self.rfile.read(length)
+        if not receiver.verify(body, self.headers.get(SIGNATURE_HEADER), self.headers.get(TIMESTAMP_HEADER)):
+            receiver.log.warning("Rejected webhook with an invalid signature from {}".format(self.client_address[0]))
+            return self._respond(403)
+
+        try:
+            payload = json.loads(body.decode('utf-8'))
+            changes = [EmployeeChange(x) for x in payload.get('employees') or []]
+        except (ValueError, AttributeError):
+            return self._respond(400)
+
+        # Answer before processing so BambooHR does not time out waiting for refetches
+        self._respond(200)
+        receiver.dispatch(changes)
+
+    def _respond(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        self.server.receiver.log.debug(format % args)
+
+
+class WebhookReceiver(object):
+    """
+    Embeddable HTTP server receiving BambooHR employee webhooks. Verified notifications
+    invalidate or refetch only the affected employees of an EmployeeCache and are passed
+    to the `on_change` callback.
+    """
+
+    def __init__(self, secret, cache=None, on_change=None, host='127.0.0.1', port=0, path='/', max_age=300):
+        """
+        :param secret: the private key shown by BambooHR when creating the webhook
+        :type secret: str
+        :param cache: the cache to keep up to date
+        :type cache: bamboopy.cache.EmployeeCache
+        :param on_change: callable receiving the list of EmployeeChange of every notification
+        :param host: the address to listen on
+        :type host: str
+        :param port: the port to listen on, 0 picks a free one
+        :type port: int
+        :param path: the path the webhook posts to
+        :type path: str
+        :param max_age: seconds after which a signed notification is rejected as a replay, None disables the check
+        :type max_age: int
+        """
+        self.secret = secret
+        self.cache = cache
+        self.on_change = on_change
+        self.path = path
+        self.max_age = max_age
+        self.log = logging_helper.get_log('bamboopy.webhooks')
+        self.httpd = server.ThreadingHTTPServer((host, port), WebhookHandler)
+        self.httpd.receiver = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def verify(self, body, signature, timestamp):
+        if not signature or not timestamp:
+            return False
+        if self.max_age is not None:
+            try:
+                if abs(time.time() - float(timestamp)) > self.max_age:
+                    return False
+            except ValueError:
+                return False
+
+        return hmac.compare_digest(sign(self.secret, body, timestamp), signature)
+
+    def _valid_changes(self, changes):
+        valid = []
+        for change in changes:
+            try:
+                employee_key(change.id)
+            except (TypeError, ValueError):
+                self.log.warning("Ignoring change of invalid employee id {!r}".format(change.id))
+                continue
+            valid.append(change)
+        return valid
+
+    def dispatch(self, changes):
+        if self.cache is not None:
+            valid = self._valid_changes(changes)
+            deleted = [x.id for x in valid if x.action == 'Deleted']
+            changed = [x.id for x in valid if x.action != 'Deleted']
+            self.cache.invalidate(deleted)
+            try:
+                self.cache.refetch(changed)
+            except Exception:
+                # Drop them so the next read fetches them again
+                self.log.exception("Could not refetch employees {}".format(changed))
+                self.cache.invalidate(changed)
+
+        if self.on_change:
+            self.on_change(changes)
+
+    def start(self):
+        """Serves in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
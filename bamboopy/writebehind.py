@@ -0,0 +1,149 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from bamboopy import logging_helper
+from bamboopy.cache import employee_key
+
+
+class PendingWrite(object):
+    """Field updates of one employee waiting to be flushed"""
+
+    def __init__(self, employee_id, deadline):
+        self.employee_id = employee_id
+        self.deadline = deadline
+        self.field_values = {}
+        self.options = {}
+        self.futures = []
+
+
+class WriteBehindQueue(object):
+    """
+    Coalesces update_employee calls: updates of the same employee queued within `window`
+    seconds of the first one are merged (later values win) and sent as a single POST by a
+    bounded set of background workers. Writes of a given employee never run concurrently,
+    so they reach the API in the order they were queued.
+    """
+
+    def __init__(self, client, window=1.0, max_workers=4, rate_limiter=None):
+        """
+        :param client: the client used to send the updates
+        :type client: bamboopy.BambooHR
+        :param window: seconds to wait for more updates of an employee before flushing them
+        :type window: float
+        :param max_workers: updates sent at the same time
+        :type max_workers: int
+        :param rate_limiter: optional limiter every update goes through
+        :type rate_limiter: bamboopy.ratelimit.RateLimiter
+        """
+        self.client = client
+        self.window = window
+        self.rate_limiter = rate_limiter
+        self.log = logging_helper.get_log('bamboopy.writebehind')
+        self.queued = 0
+        self.sent = 0
+        self._pending = {}
+        self._in_flight = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def update(self, employee_id, field_values, **options):
+        """
+        Queues an update of an employee
+        :param employee_id: the employee id
+        :type employee_id: int
+        :param field_values: field id => value
+        :type field_values: dict
+        :param options: options of the update_employee call, merged like the values (later ones win)
+        :return: a Future resolved with the result of the merged update_employee call
+        """
+        future = Future()
+        key = employee_key(employee_id)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The write-behind queue is closed")
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = PendingWrite(key, time.monotonic() + self.window)
+            pending.field_values.update(field_values)
+            pending.options.update(options)
+            pending.futures.append(future)
+            self.queued += 1
+            self._condition.notify_all()
+        return future
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def _due(self, now):
+        return [p for k, p in self._pending.items() if p.deadline <= now and k not in self._in_flight]
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed and not self._pending:
+                        # Only shut down once every pending write has been handed over
+                        self._executor.shutdown(wait=False)
+                        return
+                    now = time.monotonic()
+                    due = self._due(now)
+                    if due:
+                        break
+                    waiting = [p.deadline for k, p in self._pending.items() if k not in self._in_flight]
+                    self._condition.wait(max(min(waiting) - now, 0) if waiting else None)
+
+                for pending in due:
+                    del self._pending[pending.employee_id]
+                    self._in_flight.add(pending.employee_id)
+
+            for pending in due:
+                self._executor.submit(self._send, pending)
+
+    def _send(self, pending):
+        try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            result = self.client.update_employee(pending.employee_id, pending.field_values, **pending.options)
+        except BaseException as e:
+            for future in pending.futures:
+                future.set_exception(e)
+            self.log.warning("Update of employee {} failed: {!r}".format(pending.employee_id, e))
+        else:
+            for future in pending.futures:
+                future.set_result(result)
+        finally:
+            with self._condition:
+                self.sent += 1
+                self._in_flight.discard(pending.employee_id)
+                self._condition.notify_all()
+
+    def flush(self, wait=True):
+        """
+        Sends every pending update now instead of waiting for its window
+        :param wait: block until they are all sent
+        """
+        with self._condition:
+            now = time.monotonic()
+            for pending in self._pending.values():
+                pending.deadline = min(pending.deadline, now)
+            self._condition.notify_all()
+            while wait and (self._pending or self._in_flight):
+                self._condition.wait()
+
+    def close(self, wait=True):
+        """
+        Flushes the pending updates and stops the workers once they are sent
+        :param wait: block until they are all sent, otherwise they are sent in the background
+        """
+        self.flush(wait=False)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            self._flusher.join()
+            self._executor.shutdown(wait=True)
@@ -45,6 +45,9 @@ setup(
     packages=['bamboopy'],
     include_package_data=True,
     install_requires=['rfc6266', 'xmltodict'],
+    entry_points={
+        'console_scripts': ['bamboopy=bamboopy.cli:main'],
+    },
     keywords=['Bamboo', 'HR', 'BambooHR', 'API'],
     classifiers=[
         "Development Status :: 3 - Alpha",